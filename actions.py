@@ -5,7 +5,8 @@ from typing import Optional, Tuple, TYPE_CHECKING
 import color
 
 import math
-from entity import Facing
+from geometry import Facing
+import tracing
 
 if TYPE_CHECKING:
     from engine import Engine
@@ -13,14 +14,25 @@ if TYPE_CHECKING:
 
 
 class Action:
+    # lots of these get made every turn, so no __dict__. subclasses need their
+    # own __slots__ too, even if it's empty, or they get one back.
+    __slots__ = ("entity", "_engine")
+
     def __init__(self, entity: Actor) -> None:
         super().__init__()
         self.entity = entity
+        self._engine: Optional[Engine] = None
 
     @property
     def engine(self) -> Engine:
         """Return the engine this action belongs to."""
-        return self.entity.gamemap.engine
+        # looked up the first time it's needed, since AIs get made before
+        # their entity is on a map. the engine outlives every map, so it
+        # never goes stale.
+        engine = self._engine
+        if engine is None:
+            engine = self._engine = self.entity.gamemap.engine
+        return engine
 
     def perform(self) -> None:
         """Perform this action with the objects needed to determine its scope.
@@ -35,16 +47,33 @@ class Action:
 
 
 class EscapeAction(Action):
+    __slots__ = ()
+
     def perform(self) -> None:
         raise SystemExit()
 
 
 class WaitAction(Action):
+    __slots__ = ()
+
     def perform(self) -> None:
         pass
 
 
+class DescendAction(Action):
+    __slots__ = ()
+
+    def perform(self) -> None:
+        if self.engine.level_streamer is None:
+            return  # nowhere to go.
+
+        self.engine.descend()
+        self.engine.message_log.add_message("You descend deeper.", color.welcome_text)
+
+
 class ActionWithDirection(Action):
+    __slots__ = ("dx", "dy")
+
     def __init__(self, entity: Actor, dx: int, dy: int):
         super().__init__(entity)
 
@@ -70,10 +99,14 @@ class ActionWithDirection(Action):
         # for any action with a direction, set the facing to the direction.
         # TODO strip this out. switch to failing an action with direction if it doesn't match facing.
         # self.entity.facing = Facing.get_direction(self.dx, self.dy)
-        print(self)
-        pass
+        if tracing.mask & tracing.ACTION:
+            tracing.emit(tracing.ACTION, type(self).__name__,
+                actor=self.entity.name, x=self.entity.x, y=self.entity.y,
+                dx=self.dx, dy=self.dy)
 
 class MeleeAction(ActionWithDirection):
+    __slots__ = ()
+
     def perform(self) -> None:
         super().perform()
 
@@ -100,6 +133,8 @@ class MeleeAction(ActionWithDirection):
             )
 
 class ShootAction(ActionWithDirection):
+    __slots__ = ()
+
     def perform(self) -> None:
         super().perform()
 
@@ -114,6 +149,8 @@ class ShootAction(ActionWithDirection):
         target.fighter.hp -= damage
 
 class MovementAction(ActionWithDirection):
+    __slots__ = ()
+
     def __str__(self):
         return f'<actions.MovementAction {self.entity} {(self.entity.x, self.entity.y)}->{(self.dx, self.dy)}'
 
@@ -124,7 +161,7 @@ class MovementAction(ActionWithDirection):
 
         if not self.engine.game_map.in_bounds(dest_x, dest_y):
             return  # Destination is out of bounds.
-        if not self.engine.game_map.tiles["walkable"][dest_x, dest_y]:
+        if not self.engine.game_map.is_walkable(dest_x, dest_y):
             return  # Destination is blocked by a tile.
         if self.engine.game_map.get_blocking_entity_at_location(dest_x, dest_y):
             return  # Destination is blocked by an entity.
@@ -132,29 +169,40 @@ class MovementAction(ActionWithDirection):
         self.entity.move(self.dx, self.dy)
 
 class RotateAction(Action):
+    __slots__ = ("facing",)
+
     def __init__(self, entity: Actor, facing: Facing):
         super().__init__(entity)
         self.facing = facing
 
     def perform(self) -> None:
-        self.entity.facing = self.facing
+        self.entity.face(self.facing)
 
 class TargetLockAction(Action):
+    __slots__ = ("facing", "target")
+
     def __init__(self, entity: Actor, facing: Facing, target: Actor):
         super().__init__(entity)
         self.facing = facing
         self.target = target
 
     def perform(self) -> None:
-        self.entity.facing = self.facing
+        self.entity.face(self.facing)
         self.entity.target_lock = self.target
 
+        if tracing.mask & tracing.LOCK:
+            tracing.emit(tracing.LOCK, "lock", level=tracing.INFO,
+                actor=self.entity.name, x=self.entity.x, y=self.entity.y,
+                target=self.target.name)
+
 # this is practically only done by players. going to set facing auto on these.
 class BumpAction(ActionWithDirection):
+    __slots__ = ()
+
     def perform(self) -> None:
         super().perform()
 
-        self.entity.facing = Facing.get_direction(self.entity.x, self.entity.y, self.dx+self.entity.x, self.dy+self.entity.y)
+        self.entity.face(Facing.get_direction(self.entity.x, self.entity.y, self.dx+self.entity.x, self.dy+self.entity.y))
 
         if self.target_actor:
             return MeleeAction(self.entity, self.dx, self.dy).perform()
@@ -0,0 +1,76 @@
+from __future__ import annotations
+
+from typing import Optional, Tuple
+
+import numpy as np  # type: ignore
+
+
+class BitGrid:
+    """A 2D array of booleans, packed 8 to a byte along y.
+
+    It's an eighth of the size of a bool array, and OR/AND/NOT work on whole
+    bytes at a time. Index it with [x, y] for a single cell, and `unpack` the
+    part you actually need as a regular bool array.
+    """
+
+    def __init__(self, width: int, height: int, words: Optional[np.ndarray] = None):
+        self.width, self.height = width, height
+
+        if words is None:
+            words = np.zeros((width, (height + 7) // 8), dtype=np.uint8)
+        self.words = words
+
+        # the bits in the last byte of each column that are actually cells.
+        spare = (-height) % 8
+        self._tail = np.uint8(0xFF >> spare)
+
+    @classmethod
+    def pack(cls, cells: np.ndarray) -> BitGrid:
+        width, height = cells.shape
+        return cls(width, height, np.packbits(cells, axis=1, bitorder="little"))
+
+    @property
+    def shape(self) -> Tuple[int, int]:
+        return self.width, self.height
+
+    def __getitem__(self, xy: Tuple[int, int]) -> bool:
+        x, y = xy
+        return bool((self.words[x, y >> 3] >> (y & 7)) & 1)
+
+    def unpack(
+        self, x1: int = 0, y1: int = 0, x2: Optional[int] = None, y2: Optional[int] = None,
+    ) -> np.ndarray:
+        """Return the cells in [x1:x2, y1:y2] as a bool array."""
+        if x2 is None:
+            x2 = self.width
+        if y2 is None:
+            y2 = self.height
+
+        first, last = y1 >> 3, (y2 + 7) >> 3
+        bits = np.unpackbits(self.words[x1:x2, first:last], axis=1, bitorder="little")
+        return bits[:, y1 - first * 8 : y2 - first * 8].view(bool)
+
+    def any(self) -> bool:
+        return bool(self.words.any())
+
+    def copy(self) -> BitGrid:
+        return BitGrid(self.width, self.height, self.words.copy())
+
+    def __or__(self, other: BitGrid) -> BitGrid:
+        return BitGrid(self.width, self.height, self.words | other.words)
+
+    def __and__(self, other: BitGrid) -> BitGrid:
+        return BitGrid(self.width, self.height, self.words & other.words)
+
+    def __invert__(self) -> BitGrid:
+        words = ~self.words
+        words[:, -1] &= self._tail  # keep the padding clear.
+        return BitGrid(self.width, self.height, words)
+
+    def __ior__(self, other: BitGrid) -> BitGrid:
+        self.words |= other.words
+        return self
+
+    def __iand__(self, other: BitGrid) -> BitGrid:
+        self.words &= other.words
+        return self
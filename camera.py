@@ -0,0 +1,48 @@
+from __future__ import annotations
+
+from typing import Tuple
+
+
+class Camera:
+    """The part of the map that fits on screen, kept centered on the player.
+
+    `x`, `y` is the map position of the window's top left corner. The window
+    is drawn at `screen_x`, `screen_y` on the console.
+    """
+
+    def __init__(self, width: int, height: int, screen_x: int = 0, screen_y: int = 0):
+        self.width, self.height = width, height
+        self.screen_x, self.screen_y = screen_x, screen_y
+
+        self.x, self.y = 0, 0
+        self.map_width, self.map_height = width, height
+
+    def follow(self, x: int, y: int, map_width: int, map_height: int) -> None:
+        """Center on x, y, without showing anything past the edges of the map."""
+        self.map_width, self.map_height = map_width, map_height
+
+        self.x = max(0, min(x - self.width // 2, map_width - self.width))
+        self.y = max(0, min(y - self.height // 2, map_height - self.height))
+
+    @property
+    def bounds(self) -> Tuple[int, int, int, int]:
+        """The map area on screen as x1, y1, x2, y2 (x2 and y2 exclusive.)
+
+        Smaller than the window if the map is.
+        """
+        return (
+            self.x,
+            self.y,
+            min(self.x + self.width, self.map_width),
+            min(self.y + self.height, self.map_height),
+        )
+
+    def contains(self, x: int, y: int) -> bool:
+        x1, y1, x2, y2 = self.bounds
+        return x1 <= x < x2 and y1 <= y < y2
+
+    def to_screen(self, x: int, y: int) -> Tuple[int, int]:
+        return x - self.x + self.screen_x, y - self.y + self.screen_y
+
+    def to_map(self, screen_x: int, screen_y: int) -> Tuple[int, int]:
+        return screen_x - self.screen_x + self.x, screen_y - self.screen_y + self.y
@@ -12,3 +12,6 @@ welcome_text = (0x20, 0xA0, 0xFF)
 bar_text = white
 bar_filled = (0x0, 0x60, 0x0)
 bar_empty = (0x40, 0x10, 0x10)
+
+hud_text = (0xC0, 0xC0, 0xC0)
+hud_bg = (0x10, 0x10, 0x18)
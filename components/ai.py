@@ -1,50 +1,82 @@
 from __future__ import annotations
 
-from typing import List, Tuple, TYPE_CHECKING
+from typing import TYPE_CHECKING
 
 import numpy as np  # type: ignore
 import tcod
 
 from actions import Action, MeleeAction, MovementAction, WaitAction, RotateAction, ShootAction, TargetLockAction
 from components.base_component import BaseComponent
+from pathfinding import BLOCKED_COST, Path, repair_path
 
-from entity import Facing
+from geometry import Facing
 from enum import Enum, auto
 
 from random import random
 
 import color
+import tracing
 
 if TYPE_CHECKING:
     from entity import Actor
 
+# on maps bigger than this, routes longer than HIERARCHICAL_DISTANCE are
+# planned over the room graph instead of searching the whole map. on smaller
+# maps the full search is cheap enough that it isn't worth it.
+HIERARCHICAL_MIN_AREA = 50_000
+HIERARCHICAL_DISTANCE = 32
+
+
 class HostileMode(Enum):
     PATROL = auto()
     HUNT = auto()
     REST = auto()
 
 class BaseAI(Action, BaseComponent):
+    __slots__ = ()
+
     entity: Actor
 
     def perform(self) -> None:
         raise NotImplementedError()
 
-    def get_path_to(self, dest_x: int, dest_y: int) -> List[Tuple[int, int]]:
+    def get_path_to(self, dest_x: int, dest_y: int) -> Path:
         """Compute and return a path to the target position.
 
-        If there is no valid path then returns an empty list.
+        If there is no valid path then returns an empty path.
         """
+        game_map = self.entity.gamemap
+        walkable = game_map.walkable
+
+        if not walkable[dest_x, dest_y]:
+            return Path()  # no point searching the whole map to find that out.
+
+        start = (self.entity.x, self.entity.y)
+        distance = max(abs(dest_x - start[0]), abs(dest_y - start[1]))
+
+        if (
+            game_map.room_graph is not None
+            and game_map.width * game_map.height > HIERARCHICAL_MIN_AREA
+            and distance > HIERARCHICAL_DISTANCE
+        ):
+            # plan room to room and only search the bits in between.
+            path = game_map.room_graph.find_path(
+                walkable, start, (dest_x, dest_y), game_map.blocking_at
+            )
+            if path is not None:
+                return Path(path)
+
         # Copy the walkable array.
-        cost = np.array(self.entity.gamemap.tiles["walkable"], dtype=np.int8)
+        cost = np.array(walkable, dtype=np.int8)
 
-        for entity in self.entity.gamemap.entities:
-            # Check that an enitiy blocks movement and the cost isn't zero (blocking.)
-            if entity.blocks_movement and cost[entity.x, entity.y]:
+        for x, y in game_map.blocking_at:
+            # Check that the cost isn't zero (blocking.)
+            if cost[x, y]:
                 # Add to the cost of a blocked position.
                 # A lower number means more enemies will crowd behind each other in
                 # hallways.  A higher number means enemies will take longer paths in
                 # order to surround the player.
-                cost[entity.x, entity.y] += 10
+                cost[x, y] += BLOCKED_COST
 
         # Create a graph from the cost array and pass that graph to a new pathfinder.
         graph = tcod.path.SimpleGraph(cost=cost, cardinal=2, diagonal=3)
@@ -53,16 +85,15 @@ class BaseAI(Action, BaseComponent):
         pathfinder.add_root((self.entity.x, self.entity.y))  # Start position.
 
         # Compute the path to the destination and remove the starting point.
-        path: List[List[int]] = pathfinder.path_to((dest_x, dest_y))[1:].tolist()
-
-        # Convert from List[List[int]] to List[Tuple[int, int]].
-        return [(index[0], index[1]) for index in path]
+        return Path(pathfinder.path_to((dest_x, dest_y))[1:])
 
 
 class HostileEnemy(BaseAI):
+    __slots__ = ("path", "mode", "waypoint")
+
     def __init__(self, entity: Actor):
         super().__init__(entity)
-        self.path: List[Tuple[int, int]] = []
+        self.path = Path()
 
         self.mode = HostileMode.PATROL
         self.waypoint = None
@@ -71,47 +102,119 @@ class HostileEnemy(BaseAI):
         return f'HostileEnemy({self.entity.x}, {self.entity.y})'
 
     def is_visible(self, x, y) -> Boolean:
-        visibility = self.entity.get_visibility(
-            self.engine.game_map.tiles["transparent"])
+        # a lookup in the vision the map keeps for us. it's only recomputed
+        # if we moved, turned, or the walls changed since the last one.
+        return self.entity.gamemap.watchers.sees(self.entity, x, y)
 
-        return visibility[x, y]
+    def can_see_player(self) -> bool:
+        """Return True if this enemy can see the player.
+
+        With a symmetric FOV, if the player can't see this tile then nothing
+        standing on it can see the player either, and we can skip computing
+        our own FOV entirely.
+        """
+        if (
+            self.engine.symmetric_fov
+            and not self.engine.game_map.visible[self.entity.x, self.entity.y]
+        ):
+            return False
+
+        player = self.engine.player
+        return self.is_visible(player.x, player.y)
+
+    def set_mode(self, mode: HostileMode) -> None:
+        if tracing.mask & tracing.AI:
+            tracing.emit(tracing.AI, "mode", level=tracing.INFO,
+                actor=self.entity.name, x=self.entity.x, y=self.entity.y,
+                old=self.mode.name, new=mode.name)
+        self.mode = mode
+
+    def drop_lock(self) -> None:
+        if self.entity.target_lock is not None and tracing.mask & tracing.LOCK:
+            tracing.emit(tracing.LOCK, "unlock", level=tracing.INFO,
+                actor=self.entity.name, x=self.entity.x, y=self.entity.y)
+        self.entity.target_lock = None
 
     def perform(self) -> None:
 
         if self.mode==HostileMode.PATROL:
             # check if we happen to spot the player
-            player_visible = self.is_visible(self.engine.player.x,
-                self.engine.player.y)
+            player_visible = self.can_see_player()
 
-            print(f'Patrolling to waypoint {self.waypoint} now at {(self.entity.x, self.entity.y)}')
+            if tracing.mask & tracing.AI:
+                tracing.emit(tracing.AI, "patrol", actor=self.entity.name,
+                    x=self.entity.x, y=self.entity.y, waypoint=self.waypoint)
 
             if player_visible:
-                print("SAW PLAYER, HUNTING")
-                self.mode=HostileMode.HUNT
+                self.set_mode(HostileMode.HUNT)
             else:
-                if self.waypoint == None:
-                    # we need to set a new waypoint.
-                    self.path = []
-                    tx = 0
-                    ty = 0
+                self.update_waypoint()
 
-                    while len(self.path)==0:
-                        tx = int(random()*self.engine.game_map.width)
-                        ty = int(random()*self.engine.game_map.height)
+        elif self.mode==HostileMode.HUNT:
+            return self.perform_hunt()
+        elif tracing.mask & tracing.AI:
+            tracing.emit(tracing.AI, "unhandled_mode", level=tracing.WARNING,
+                actor=self.entity.name, mode=self.mode.name)
 
-                        self.path = self.get_path_to(tx, ty)
-                        # print(f'setting path: {self.path}')
+        return self.follow_path()
 
-                    self.waypoint = (tx, ty)
+    def advance(self, turns: int) -> None:
+        """Catch up on `turns` turns of patrolling, back to back.
 
-                if (self.waypoint[0] == self.entity.x) and (self.waypoint[1] == self.entity.y):
-                    print("Arrived at destination.")
-                    self.waypoint = None
+        This is the cheap path the scheduler uses for enemies that are too far
+        away to possibly see the player: no perception, just walking the
+        patrol route. Anything not patrolling gets a normal turn.
+        """
+        if self.mode != HostileMode.PATROL:
+            return self.perform()
 
-        elif self.mode==HostileMode.HUNT:
-            return self.perform_hunt()
-        else:
-            print('Unhandled mode.')
+        for _ in range(turns):
+            self.update_waypoint()
+            self.follow_path()
+
+    def update_waypoint(self) -> None:
+        if self.waypoint == None:
+            # we need to set a new waypoint.
+            self.path = Path()
+            tx = 0
+            ty = 0
+
+            while len(self.path)==0:
+                tx = int(random()*self.engine.game_map.width)
+                ty = int(random()*self.engine.game_map.height)
+
+                self.path = self.get_path_to(tx, ty)
+                # print(f'setting path: {self.path}')
+
+            self.waypoint = (tx, ty)
+
+        if (self.waypoint[0] == self.entity.x) and (self.waypoint[1] == self.entity.y):
+            if tracing.mask & tracing.AI:
+                tracing.emit(tracing.AI, "arrived", actor=self.entity.name,
+                    x=self.entity.x, y=self.entity.y)
+            self.waypoint = None
+
+    def reroute(self) -> bool:
+        """Get around something blocking the next step of our path.
+
+        Returns True if the next step is clear afterwards.
+        """
+        game_map = self.engine.game_map
+        if repair_path(self.path, game_map, (self.entity.x, self.entity.y)):
+            return True
+
+        # no way around it nearby, so plan the whole route again.
+        if self.waypoint is not None:
+            self.path = self.get_path_to(*self.waypoint)
+
+        return bool(self.path) and not game_map.get_blocking_entity_at_location(*self.path[0])
+
+    def follow_path(self) -> None:
+        if self.path and self.engine.game_map.get_blocking_entity_at_location(*self.path[0]):
+            # something has stepped onto our route. if there's no way around
+            # it, wait for it to move along.
+            if not self.reroute():
+                return WaitAction(self.entity).perform()
 
         if self.path:
             dest_x, dest_y = self.path[0]
@@ -121,11 +224,14 @@ class HostileEnemy(BaseAI):
             # print(f'checking facing: {(dest_x, dest_y)} direction {moving_direction} current facing {self.entity.facing}')
 
             if(moving_direction == self.entity.facing):
-                # now pop it.
-                self.path.pop(0)
-                return MovementAction(
+                MovementAction(
                     self.entity, dest_x - self.entity.x, dest_y - self.entity.y,
                 ).perform()
+                # only pop it once we're there. if the move didn't happen, the
+                # step is still ahead of us.
+                if (self.entity.x, self.entity.y) == (dest_x, dest_y):
+                    self.path.pop()
+                return
             else:
                 # print(f'returning rotate action to {moving_direction}')
                 return RotateAction(self.entity, moving_direction).perform()
@@ -147,7 +253,7 @@ class HostileEnemy(BaseAI):
                 # if yes, check if we're facing. if we are, fire. otherwise, rotate.
                 # if self.engine.game_map.visible[self.entity.x, self.entity.y]:
 
-                target_is_visible = self.is_visible(target.x, target.y)
+                target_is_visible = self.can_see_player()
 
                 # reasons to drop a lock:
                 #   moving
@@ -159,7 +265,7 @@ class HostileEnemy(BaseAI):
                         self.entity.y, target.x, target.y)
 
                     if distance <= 1:
-                        self.entity.target_lock = None
+                        self.drop_lock()
                         self.engine.message_log.add_message(
                             f"You got in close, enemy lost their lock!", color.white
                         )
@@ -182,8 +288,8 @@ class HostileEnemy(BaseAI):
                         # lock is held in this case because they can see you they just know they can't hit you yet.
 
                         # 8.18.20 -- actually, this should probably be change into SEARCH mode when that exists. Last known location. and also moving out of range but still being visible is a case we'll grapple with more when there's shotgun enemies. but that's a later problem.
-                        self.mode = HostileMode.PATROL
-                        self.entity.target_lock = None
+                        self.set_mode(HostileMode.PATROL)
+                        self.drop_lock()
 
                         return WaitAction(self.entity).perform()
                         self.path = self.get_path_to(target.x, target.y)
@@ -191,8 +297,8 @@ class HostileEnemy(BaseAI):
 
                     # if target is not visibile, return to patrol.
                     # eventually this should be a SEARCH variant.
-                    self.mode = HostileMode.PATROL
-                    self.entity.target_lock = None
+                    self.set_mode(HostileMode.PATROL)
+                    self.drop_lock()
 
                     return WaitAction(self.entity).perform()
 
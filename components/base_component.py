@@ -8,6 +8,9 @@ if TYPE_CHECKING:
 
 
 class BaseComponent:
+    # empty, so subclasses can have slots and still mix in with Action.
+    __slots__ = ()
+
     entity: Entity  # Owning entity instance.
 
     @property
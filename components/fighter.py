@@ -12,6 +12,8 @@ if TYPE_CHECKING:
 
 
 class Fighter(BaseComponent):
+    __slots__ = ("entity", "max_hp", "_hp", "defense", "power")
+
     entity: Actor
 
     def __init__(self, hp: int, defense: int, power: int):
@@ -46,4 +48,11 @@ class Fighter(BaseComponent):
         self.entity.name = f"remains of {self.entity.name}"
         self.entity.render_order = RenderOrder.CORPSE
 
+        if self.engine.player is self.entity:
+            # it's a corpse now, as far as the map is concerned.
+            self.entity.gamemap.add_entity(self.entity)
+        else:
+            # nobody needs to touch an enemy again once it's dead.
+            self.entity.gamemap.bake_decal(self.entity)
+
         self.engine.message_log.add_message(death_message, death_message_color)
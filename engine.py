@@ -1,46 +1,266 @@
 from __future__ import annotations
 
-from typing import TYPE_CHECKING
+from collections import deque
+from contextlib import contextmanager
+import threading
+import time
+from typing import Deque, Iterable, Iterator, Optional, TYPE_CHECKING
 
 from tcod.console import Console
 from tcod.map import compute_fov
 
+from actions import MovementAction, WaitAction
+from camera import Camera
+import color
+from entity import VISION_RADIUS
+from fov import FovSettings
 from input_handlers import MainGameEventHandler
 from message_log import MessageLog
-from render_functions import render_bar, render_names_at_mouse_location
+from profiling import PerfStats, Profiler
+from render_functions import (
+    render_bar, render_names_at_mouse_location, render_perf_hud,
+)
+from scheduler import TurnScheduler
+from snapshot import Snapshot
 
 if TYPE_CHECKING:
+    from actions import Action
     from entity import Actor
     from game_map import GameMap
     from input_handlers import EventHandler
+    from level_streaming import LevelStreamer
+
+
+# how many turns back you can rewind.
+REWIND_TURNS = 50
 
 
 class Engine:
     game_map: GameMap
 
-    def __init__(self, player: Actor):
+    def __init__(
+        self,
+        player: Actor,
+        symmetric_fov: bool = False,
+        viewport_width: int = 160,
+        viewport_height: int = 86,
+        fov: Optional[FovSettings] = None,
+    ):
         self.event_handler: EventHandler = MainGameEventHandler(self)
         self.message_log = MessageLog()
-        self.mouse_location = (0, 0)
+        self.mouse_location = (0, 0)  # in map coordinates
         self.player = player
+        # the part of the map that's on screen. the map can be bigger.
+        self.camera = Camera(viewport_width, viewport_height)
+        self.scheduler = TurnScheduler(self)
+        self.profiler = Profiler(self)
+        # the F3 overlay's numbers.
+        self.perf = PerfStats()
+
+        # where new levels come from, if there's more than one.
+        self.level_streamer: Optional[LevelStreamer] = None
+
+        # the FOV algorithm for the player, the enemies and the vision overlay.
+        # symmetric_fov picks the defaults, see FovSettings.
+        self.fov = fov if fov is not None else FovSettings.defaults(symmetric_fov)
+
+        # what the player's FOV was last computed from. see update_fov.
+        self._fov_key: Optional[tuple] = None
+
+        # the state at the start of each of the last few player turns.
+        self.history: Deque[Snapshot] = deque(maxlen=REWIND_TURNS)
+
+        # held while the game state is being changed, a step at a time, so
+        # the game can be drawn from another thread between steps. see
+        # game_loop, which also sets drawn_concurrently while it runs.
+        self.lock = threading.RLock()
+        self.drawn_concurrently = False
+        # set during fast_forward. no frames get drawn until it's over.
+        self.fast_forwarding = False
+
+    @property
+    def symmetric_fov(self) -> bool:
+        """With a symmetric FOV, anything that can see the player is standing on
+        a tile the player can see, so the enemy AI can use the player's
+        visible array as an exact prefilter. Otherwise there's no prefilter,
+        since it could hide the player from an enemy that can see them.
+        """
+        return self.fov.symmetric
+
+    @property
+    def player_fov_algorithm(self) -> int:
+        return self.fov.player
+
+    @property
+    def enemy_fov_algorithm(self) -> int:
+        return self.fov.enemy
+
+    @property
+    def overlay_fov_algorithm(self) -> int:
+        return self.fov.overlay
+
+    def calibrate_fov(self, min_symmetry: float = 1.0) -> FovSettings:
+        """Switch to the fastest FOV algorithms for the current map. See fov.calibrate."""
+        # the player's FOV has no radius, see update_fov.
+        self.fov = FovSettings.calibrated(
+            self.game_map.transparent, 0, VISION_RADIUS, min_symmetry
+        )
+        return self.fov
 
     def handle_enemy_turns(self) -> None:
-        for entity in set(self.game_map.actors) - {self.player}:
-            if entity.ai:
-                entity.ai.perform()
+        start = time.perf_counter()
+        self.scheduler.run_turn()
+        self.perf.ai = time.perf_counter() - start
+        self.profiler.turn_done()
+
+    def play_turn(self, action: Action) -> None:
+        """The player does `action`, then everyone else gets their turn."""
+        with self.lock:
+            self.checkpoint()
+            action.perform()
+            # before the enemies go. they use the player's FOV to see who could
+            # spot them, so it has to be from where the player is now.
+            self.update_fov()
+
+        # the scheduler takes the lock one enemy at a time.
+        self.handle_enemy_turns()
+
+    def snapshot(self) -> Snapshot:
+        return Snapshot(self)
+
+    def restore(self, snapshot: Snapshot) -> None:
+        snapshot.restore(self)
+        self.update_fov()
+
+    def checkpoint(self) -> None:
+        """Remember how things are now, so the coming turn can be rewound."""
+        self.history.append(self.snapshot())
+
+    def rewind(self) -> bool:
+        """Undo the last player turn, if there's one to undo."""
+        if not self.history:
+            return False
+
+        with self.lock:
+            self.restore(self.history.pop())
+        return True
+
+    @contextmanager
+    def forked(self) -> Iterator[Engine]:
+        """Play things out to see what happens, and put everything back after.
+
+            with engine.forked():
+                MovementAction(enemy, 1, 0).perform()
+                ...
+        """
+        with self.lock:
+            snapshot = self.snapshot()
+            try:
+                yield self
+            finally:
+                self.restore(snapshot)
+
+    def player_targeted(self) -> bool:
+        """Has anything got a target lock on the player?"""
+        return any(actor.target_lock is self.player for actor in self.game_map.actors)
+
+    def fast_forward(self, actions: Iterable[Action]) -> int:
+        """Play out a run of player actions back to back. Returns the turns taken.
+
+        Nothing gets drawn until it's over. Stops early if the player gets hurt
+        or anything locks on to them.
+        """
+        player = self.player
+        hp = player.fighter.hp
+        turns = 0
+
+        # rewinding undoes the whole thing.
+        with self.lock:
+            self.checkpoint()
+            self.fast_forwarding = True
+
+        try:
+            for action in actions:
+                if not player.is_alive:
+                    break
+                if player.fighter.hp < hp or self.player_targeted():
+                    self.message_log.add_message("You are interrupted.", color.enemy_atk)
+                    break
+
+                with self.lock:
+                    action.perform()
+                    # the enemy AI uses the player's FOV to see who could spot
+                    # them, so it has to keep up. standing still it's cached and
+                    # costs nothing.
+                    self.update_fov()
+                self.handle_enemy_turns()
+                turns += 1
+        finally:
+            self.fast_forwarding = False
+
+        return turns
+
+    def rest(self, turns: int) -> int:
+        """Wait for up to `turns` turns."""
+        return self.fast_forward(WaitAction(self.player) for _ in range(turns))
+
+    def travel(self, x: int, y: int) -> int:
+        """Walk to x, y, stopping if anything gets in the way."""
+        path = self.player.ai.get_path_to(x, y)
+
+        def steps() -> Iterator[Action]:
+            for step_x, step_y in path.remaining.tolist():
+                yield MovementAction(
+                    self.player, step_x - self.player.x, step_y - self.player.y
+                )
+                if (self.player.x, self.player.y) != (step_x, step_y):
+                    return  # something's in the way.
+
+        return self.fast_forward(steps())
+
+    def descend(self) -> None:
+        """Swap the current map out for the next level."""
+        # building the level moves the player over to it, so it all happens
+        # under the lock. the level is normally done already, so this is quick.
+        with self.lock:
+            self.game_map = self.level_streamer.next_level(self)
+            # snapshots can't take us back to the last level, see Snapshot.
+            self.history.clear()
+            self.update_fov()
 
     def update_fov(self) -> None:
         """Recompute the visible area based on the players point of view."""
-        self.game_map.visible[:] = compute_fov(
-            self.game_map.tiles["transparent"],
+        # the FOV only depends on where we are and what the walls look like,
+        # so if neither changed there's nothing to do.
+        fov_key = (
+            self.game_map,
+            self.player.x,
+            self.player.y,
+            self.game_map.tile_changes.version,
+            self.player_fov_algorithm,
+        )
+        if fov_key == self._fov_key:
+            self.perf.fov = 0.0
+            return
+        self._fov_key = fov_key
+
+        start = time.perf_counter()
+        self.game_map.set_visible(compute_fov(
+            self.game_map.transparent,
             (self.player.x, self.player.y),
             radius=0,
-        )
-        # If a tile is "visible" it should be added to "explored".
-        self.game_map.explored |= self.game_map.visible
+            algorithm=self.player_fov_algorithm,
+        ))
+        self.perf.fov = time.perf_counter() - start
 
     def render(self, console: Console) -> None:
-        self.game_map.render(console)
+        start = time.perf_counter()
+        self.perf.frame_started(start)
+
+        self.camera.follow(
+            self.player.x, self.player.y, self.game_map.width, self.game_map.height
+        )
+        self.game_map.render(console, self.camera)
 
         self.message_log.render(console=console, x=21, y=90, width=40, height=5)
 
@@ -52,3 +272,10 @@ class Engine:
         )
 
         render_names_at_mouse_location(console=console, x=21, y=44, engine=self)
+
+        # it shows the last frame's render time, this one isn't done yet.
+        if self.perf.visible:
+            render_perf_hud(console=console, x=console.width - 44, y=0, engine=self)
+        self.perf.render = time.perf_counter() - start
+
+        self.profiler.frame_done()
@@ -1,8 +1,9 @@
 from __future__ import annotations
 
-import copy, math
+import copy
 from typing import Optional, Tuple, Type, TypeVar, TYPE_CHECKING
 
+from geometry import cone, Facing
 from render_order import RenderOrder
 import tcod
 import numpy as np
@@ -14,59 +15,8 @@ if TYPE_CHECKING:
 
 T = TypeVar("T", bound="Entity")
 
-from enum import auto, Enum
-class Facing(Enum):
-    NW = auto()
-    N = auto()
-    NE = auto()
-    E = auto()
-    SE = auto()
-    S = auto()
-    SW = auto()
-    W = auto()
-
-    @classmethod
-    def get_pos(cls, f: Facing):
-        map = {Facing.NW: (-1, -1), Facing.N: (0, -1), Facing.NE: (1, -1), Facing.E: (1, 0), Facing.SE: (1, 1), Facing.S: (0, 1), Facing.SW: (-1,1), Facing.W: (-1, 0)}
-        return map[f]
-
-    @classmethod
-    def get_angle(cls, f: Facing):
-        pos = cls.get_pos(f)
-        return math.atan2(pos[0], pos[1])
-
-    @classmethod
-    def get_direction(cls,
-        x1:int, y1:int,
-        x2:int = 0, y2:int = 0):
-
-        dx = x2-x1
-        dy = y2-y1
-
-        # this angle is in radians
-        # 0 = up, 1=right
-        angle = math.atan2(dy, dx)
-
-        # i want to map this down to 0/1/-1 on two axes.
-        # or maybe I'm just weak and do the map version.
-        # these = are a little shaky and I'm not sure they're mutually exclusive
-        if angle <= math.pi/8 and angle > -math.pi/8:
-            return Facing.E
-        elif angle <= 3*math.pi/8 and angle > math.pi/8:
-            return Facing.SE
-        elif angle <= 5*math.pi/8 and angle > 3*math.pi/8:
-            return Facing.S
-        elif angle <= 7*math.pi/8 and angle > 5*math.pi/8:
-            return Facing.SW
-        elif angle >= 7*math.pi/8 or angle < -7*math.pi/8:
-            return Facing.W
-        elif angle >= -3*math.pi/8 and angle < -math.pi/8:
-            return Facing.NE
-        elif angle >= -5*math.pi/8 and angle < -3*math.pi/8:
-            return Facing.N
-        elif angle >= -7*math.pi/8 and angle < -5*math.pi/8:
-            return Facing.NW
-
+# how far enemies can see, straight ahead.
+VISION_RADIUS = 24
 
 
 class Entity:
@@ -74,6 +24,13 @@ class Entity:
     A generic object to represent players, enemies, items, etc.
     """
 
+    # slots, because big maps have a lot of these. anything that wants to hang
+    # a new attribute on an entity has to add it here.
+    __slots__ = (
+        "gamemap", "x", "y", "facing", "char", "color", "name", "blocks_movement",
+        "render_order",
+    )
+
     gamemap: GameMap
 
     def __init__(
@@ -99,37 +56,78 @@ class Entity:
         if gamemap:
             # If gamemap isn't provided now then it will be set later.
             self.gamemap = gamemap
-            gamemap.entities.add(self)
+            gamemap.add_entity(self)
 
     def __str__(self):
         return f'({self.name}: ({self.x}, {self.y}):{self.facing})'
 
+    def __deepcopy__(self, memo):
+        # copy's generic path for slotted objects packs everything into a
+        # tuple and a dict first, which makes spawning a good bit slower.
+        clone = object.__new__(type(self))
+        memo[id(self)] = clone
+        for name in self._slot_names():
+            try:
+                value = getattr(self, name)
+            except AttributeError:
+                continue  # never set, like gamemap on a template.
+            setattr(clone, name, copy.deepcopy(value, memo))
+        return clone
+
+    @classmethod
+    def _slot_names(cls) -> Tuple[str, ...]:
+        names = cls.__dict__.get("_all_slots")
+        if names is None:
+            names = tuple(
+                name for klass in reversed(cls.__mro__)
+                for name in klass.__dict__.get("__slots__", ())
+            )
+            cls._all_slots = names
+        return names
+
     def spawn(self: T, gamemap: GameMap, x: int, y: int) -> T:
         """Spawn a copy of this instance at the given location."""
         clone = copy.deepcopy(self)
         clone.x = x
         clone.y = y
         clone.gamemap = gamemap
-        gamemap.entities.add(clone)
+        gamemap.add_entity(clone)
         return clone
 
     def place(self, x: int, y: int, gamemap: Optional[GameMap] = None) -> None:
         """Place this entitiy at a new location.  Handles moving across GameMaps."""
-        self.x = x
-        self.y = y
         if gamemap:
             if hasattr(self, "gamemap"):  # Possibly uninitialized.
-                self.gamemap.entities.remove(self)
+                self.gamemap.remove_entity(self)
+            self.x = x
+            self.y = y
             self.gamemap = gamemap
-            gamemap.entities.add(self)
+            gamemap.add_entity(self)
+        else:
+            self.x = x
+            self.y = y
+            if hasattr(self, "gamemap"):
+                self.gamemap.entity_moved(self)
 
     def move(self, dx: int, dy: int) -> None:
         # Move the entity by a given amount
         self.x += dx
         self.y += dy
+        self.gamemap.entity_moved(self)
+
+    def face(self, facing: Facing) -> None:
+        """Turn to `facing`. Use this rather than setting facing, so the map
+        knows what the enemies are looking at."""
+        if facing is self.facing:
+            return
+        self.facing = facing
+        if hasattr(self, "gamemap"):
+            self.gamemap.entity_turned(self)
 
 
 class Actor(Entity):
+    __slots__ = ("ai", "is_player", "fighter", "target_lock")
+
     def __init__(
         self,
         *,
@@ -161,51 +159,31 @@ class Actor(Entity):
         # abstract into a hostile class? PC can't have a target lock i think?
         self.target_lock = None
 
-    def get_visibility(self, tiles):
-        visibility = tcod.map.compute_fov(
-            tiles, (self.x, self.y), algorithm=1, radius=24)
-
-        # now, whack it with a facing mask.
-        # my meh idea for this is raytracing.
-
-        # I think there's a one command way to do this but i'm lazy
-        mask = np.full(tiles.shape, False)
-        facing_angle = Facing.get_angle(self.facing)
+    def vision(
+        self, tiles, algorithm: Optional[int] = None
+    ) -> Tuple[Tuple[int, int, int, int], np.ndarray]:
+        """What this actor can see, as the box around it its sight fits in
+        (x1, y1, x2, y2) and a bool array of the cells in that box."""
+        if algorithm is None:
+            algorithm = self.gamemap.engine.enemy_fov_algorithm
+
+        # the FOV radius keeps it all inside the cone's box, and nothing
+        # outside the box can cast a shadow into it, so the FOV only needs
+        # computing on that part of the map.
+        r = VISION_RADIUS
+        width, height = tiles.shape
+        x1, y1 = max(0, self.x - r), max(0, self.y - r)
+        x2, y2 = min(width, self.x + r + 1), min(height, self.y + r + 1)
 
-        # I feel like there's a clever list comprehension here but...
-        # ths is expensive. we only want to consider True values here
-        # but I don't know how to back out from a tile to its coordinates.
-        # this makes make think that ultimately tiles need unique ids not just be naked booleans?
-        for x in range(0, visibility.shape[0]):
-            for y in range(0, visibility.shape[1]):
-
-                visible = visibility[x][y]
-                if not visible:
-                    continue
-
-                # first, compute the distance to the entity.
-                # then compute the angle.
-                # then set true/false based on the acceptable range for that angle.
-
-                # could do this fancy with pathfinder/djikstra but fuck it, pythagoras had this worked out fine.
-                distance = int(math.sqrt(math.pow(self.x-x, 2) + math.pow(self.y-y, 2)))
-
-                angle = math.atan2(self.x-x, self.y-y) + math.pi
-                angle_distance = min(abs(angle-facing_angle),
-                                         2*math.pi - (angle-facing_angle))
-
-                if(angle_distance < math.pi/4):
-                    r = 24
-                elif(angle_distance < math.pi/2):
-                    r = 6
-                else:
-                    r = 2
+        visibility = tcod.map.compute_fov(
+            tiles[x1:x2, y1:y2], (self.x - x1, self.y - y1), algorithm=algorithm, radius=r)
 
-                # flip it to False if it's out of range for the angle.
-                if distance > r:
-                    visibility[x][y] = False
+        # now, whack it with a facing mask: full range straight ahead, a bit to
+        # the sides, barely any behind.
+        stencil = cone(self.facing, r, 6, 2)
+        visibility &= stencil[x1 - self.x + r:x2 - self.x + r, y1 - self.y + r:y2 - self.y + r]
 
-        return visibility
+        return (x1, y1, x2, y2), visibility
 
     # this is an odd way to do this. probably fine, but this was the side-effecting problem with setting AI to null.
     @property
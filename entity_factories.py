@@ -24,3 +24,7 @@ troll = Actor(
     ai_cls=HostileEnemy,
     fighter=Fighter(hp=16, defense=1, power=4),
 )
+
+# everything procgen can spawn, by name. levels generated in another process
+# come back as names and positions, and get rebuilt from these.
+monsters = {orc.name: orc, troll.name: troll}
@@ -0,0 +1,211 @@
+#!/usr/bin/env python3
+"""Which FOV algorithm gets used where, and a way to pick them by measuring.
+
+Run it directly to calibrate on a freshly generated map:
+
+    python fov.py --size 600x400
+"""
+from __future__ import annotations
+
+import random
+import time
+from typing import Dict, List, NamedTuple, Optional, Tuple
+
+import numpy as np  # type: ignore
+import tcod
+
+# tcod's FOV algorithms, by name.
+ALGORITHMS: Dict[str, int] = {
+    "basic": tcod.FOV_BASIC,
+    "diamond": tcod.FOV_DIAMOND,
+    "shadow": tcod.FOV_SHADOW,
+    **{f"permissive_{n}": getattr(tcod, f"FOV_PERMISSIVE_{n}") for n in range(9)},
+    "restrictive": tcod.FOV_RESTRICTIVE,
+    "symmetric_shadowcast": tcod.FOV_SYMMETRIC_SHADOWCAST,
+}
+NAMES = {algorithm: name for name, algorithm in ALGORITHMS.items()}
+
+# algorithms that are symmetric by design: if a can see b, b can see a.
+SYMMETRIC = {tcod.FOV_SYMMETRIC_SHADOWCAST}
+
+
+class FovSettings:
+    """The FOV algorithm for each place the game computes one.
+
+    `player` is the player's FOV, `enemy` is what enemies see when deciding
+    whether they've spotted the player, and `overlay` is the enemy vision
+    drawn in vision mode.
+    """
+
+    def __init__(self, player: int, enemy: int, overlay: int):
+        self.player = player
+        self.enemy = enemy
+        self.overlay = overlay
+
+        # can the enemy AI treat the player's FOV as an exact prefilter? only
+        # if anything that sees the player is guaranteed to be seen back,
+        # which takes the same symmetric algorithm on both sides.
+        self.symmetric = player == enemy and player in SYMMETRIC
+
+    def __repr__(self) -> str:
+        return (
+            f"FovSettings(player={NAMES[self.player]}, enemy={NAMES[self.enemy]},"
+            f" overlay={NAMES[self.overlay]})"
+        )
+
+    @classmethod
+    def defaults(cls, symmetric: bool) -> FovSettings:
+        if symmetric:
+            return cls(
+                player=tcod.FOV_SYMMETRIC_SHADOWCAST,
+                enemy=tcod.FOV_SYMMETRIC_SHADOWCAST,
+                overlay=tcod.FOV_SYMMETRIC_SHADOWCAST,
+            )
+        return cls(
+            player=tcod.FOV_RESTRICTIVE, enemy=tcod.FOV_DIAMOND, overlay=tcod.FOV_DIAMOND
+        )
+
+    @classmethod
+    def calibrated(
+        cls,
+        transparent: np.ndarray,
+        player_radius: int,
+        enemy_radius: int,
+        min_symmetry: float = 1.0,
+        seed: int = 0,
+    ) -> FovSettings:
+        """The fastest settings for this map that are still symmetric enough.
+
+        Each site is timed at its own radius. A sample can't prove symmetry,
+        so asking for all of it only picks from the algorithms that are
+        symmetric by design, the same one for player and enemy, which keeps
+        the AI prefilter exact. Asking for less lets each site pick its own,
+        and the prefilter goes off (see Engine.symmetric_fov). The overlay is
+        just for looks, so it gets the fastest of all at the enemy radius.
+        """
+        player = calibrate(transparent, player_radius, seed=seed)
+        enemy = calibrate(transparent, enemy_radius, seed=seed)
+        overlay = min(enemy, key=lambda r: r.seconds).algorithm
+
+        if min_symmetry >= 1.0:
+            # it runs at both sites, so it's the two together that count.
+            seconds = {r.algorithm: r.seconds for r in player if r.algorithm in SYMMETRIC}
+            for result in enemy:
+                if result.algorithm in seconds:
+                    seconds[result.algorithm] += result.seconds
+            best = min(seconds, key=seconds.__getitem__)
+            return cls(player=best, enemy=best, overlay=overlay)
+
+        def fastest(results: List[Calibration]) -> int:
+            good = [r for r in results if r.symmetry >= min_symmetry]
+            if not good:
+                raise ValueError(f"no FOV algorithm is {min_symmetry:.0%} symmetric here")
+            return min(good, key=lambda r: r.seconds).algorithm
+
+        return cls(player=fastest(player), enemy=fastest(enemy), overlay=overlay)
+
+
+class Calibration(NamedTuple):
+    algorithm: int
+    seconds: float  # per compute_fov call.
+    symmetry: float  # of the pairs where a saw b, how often b saw a back.
+
+    @property
+    def name(self) -> str:
+        return NAMES[self.algorithm]
+
+
+def calibrate(
+    transparent: np.ndarray,
+    radius: int,
+    origins: int = 40,
+    pairs: int = 10,
+    seed: int = 0,
+) -> List[Calibration]:
+    """Time every algorithm on this map, and check how symmetric it is.
+
+    FOVs are computed from `origins` random open tiles. For each, `pairs` of
+    the open tiles it can see get an FOV of their own, to see if they see it
+    back. Walls are left out, nothing stands in them.
+    """
+    rng = random.Random(seed)
+    xs, ys = np.nonzero(transparent)
+    starts = [
+        (int(xs[i]), int(ys[i])) for i in (rng.randrange(len(xs)) for _ in range(origins))
+    ]
+
+    results = []
+    for algorithm in ALGORITHMS.values():
+        fovs: Dict[Tuple[int, int], np.ndarray] = {}
+        calls, elapsed = 0, 0.0
+
+        def fov_from(origin: Tuple[int, int]) -> np.ndarray:
+            nonlocal calls, elapsed
+            if origin not in fovs:
+                start = time.perf_counter()
+                fovs[origin] = tcod.map.compute_fov(
+                    transparent, origin, radius=radius, algorithm=algorithm
+                )
+                elapsed += time.perf_counter() - start
+                calls += 1
+            return fovs[origin]
+
+        agree = checked = 0
+        for origin in starts:
+            seen_x, seen_y = np.nonzero(fov_from(origin) & transparent)
+            for i in rng.sample(range(len(seen_x)), min(pairs, len(seen_x))):
+                other = int(seen_x[i]), int(seen_y[i])
+                if other == origin:
+                    continue
+                checked += 1
+                agree += bool(fov_from(other)[origin])
+
+        results.append(
+            Calibration(algorithm, elapsed / calls, agree / checked if checked else 1.0)
+        )
+
+    return results
+
+
+def main(argv: Optional[List[str]] = None) -> None:
+    import argparse
+    import copy
+
+    import entity_factories
+    from engine import Engine
+    from entity import VISION_RADIUS
+    from procgen import generate_dungeon
+
+    parser = argparse.ArgumentParser(description="Time tcod's FOV algorithms on a generated map.")
+    parser.add_argument("--size", default="160x86", help="map size, as WIDTHxHEIGHT")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--min-symmetry", type=float, default=1.0)
+    args = parser.parse_args(argv)
+
+    width, height = (int(n) for n in args.size.lower().split("x"))
+    random.seed(args.seed)
+    engine = Engine(player=copy.deepcopy(entity_factories.player))
+    game_map = generate_dungeon(
+        max_rooms=max(10, width * height // 1400),
+        room_min_size=15,
+        room_max_size=30,
+        map_width=width,
+        map_height=height,
+        max_monsters_per_room=0,
+        engine=engine,
+    )
+
+    for site, radius in (("player", 0), ("enemy", VISION_RADIUS)):
+        print(f"{site} (radius {radius}):")
+        for result in sorted(calibrate(game_map.transparent, radius, seed=args.seed),
+                             key=lambda r: r.seconds):
+            print(f"  {result.name:>22} {result.seconds * 1e6:9.1f} us {result.symmetry:7.1%}")
+
+    settings = FovSettings.calibrated(
+        game_map.transparent, 0, VISION_RADIUS, args.min_symmetry, seed=args.seed
+    )
+    print(settings)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,136 @@
+from __future__ import annotations
+
+import asyncio
+from concurrent.futures import ThreadPoolExecutor
+import time
+from typing import Optional, TYPE_CHECKING
+
+import tcod
+
+if TYPE_CHECKING:
+    from engine import Engine
+
+# how often a frame gets drawn, whether or not anything happened.
+FPS = 60
+# how often SDL gets asked for new input. SDL has nothing asyncio can wait on,
+# so it's polled.
+INPUT_HZ = 250
+
+
+class GameLoop:
+    """Input, simulation and drawing as three asyncio tasks.
+
+    - input polls SDL on the main thread (it has to be that one) and queues
+      the events up.
+    - simulation takes events off the queue in order, and hands each one to
+      the current event handler on a separate thread. A slow turn only holds
+      up the next turn, not the window.
+    - drawing renders and presents a frame `fps` times a second, so the vision
+      sweep keeps animating while enemies take their turns.
+
+    The simulation holds `engine.lock` while it changes things, one step at a
+    time, and drawing takes it while it renders. A frame never sees an actor
+    half way through its turn, but it can see half the enemies moved. Waiting
+    for the lock would hold up the event loop, and input with it, so frames
+    are rendered on a thread of their own and only presented on the main one.
+    """
+
+    def __init__(
+        self, engine: Engine, context: tcod.context.Context, console: tcod.Console,
+        fps: int = FPS,
+    ):
+        self.engine = engine
+        self.context = context
+        self.console = console
+        self.fps = fps
+
+        self.events: Optional[asyncio.Queue] = None
+        # one thread, so events are handled one at a time and in order.
+        self.simulator = ThreadPoolExecutor(max_workers=1, thread_name_prefix="simulation")
+        self.renderer = ThreadPoolExecutor(max_workers=1, thread_name_prefix="drawing")
+
+    def run(self) -> None:
+        """Play until something raises SystemExit."""
+        self.engine.drawn_concurrently = True
+        try:
+            asyncio.run(self.main())
+        finally:
+            self.simulator.shutdown(wait=True)
+            self.renderer.shutdown(wait=True)
+            self.engine.drawn_concurrently = False
+
+    async def main(self) -> None:
+        self.events = asyncio.Queue()
+        # whichever finishes first (by quitting or crashing) ends the game.
+        tasks = [
+            asyncio.create_task(self.poll_input(), name="input"),
+            asyncio.create_task(self.simulate(), name="simulation"),
+            asyncio.create_task(self.draw(), name="drawing"),
+        ]
+        try:
+            done, _ = await asyncio.wait(tasks, return_when=asyncio.FIRST_COMPLETED)
+            for task in done:
+                task.result()
+        finally:
+            for task in tasks:
+                task.cancel()
+
+    async def poll_input(self) -> None:
+        while True:
+            for event in tcod.event.get():
+                # needs the context, so it's done here and not on the
+                # simulation thread.
+                self.context.convert_event(event)
+                self.events.put_nowait(event)
+            await asyncio.sleep(1 / INPUT_HZ)
+
+    async def simulate(self) -> None:
+        loop = asyncio.get_running_loop()
+        engine = self.engine
+
+        while True:
+            event = await self.events.get()
+            # looked up on the simulation thread, since the last event may
+            # have swapped the handler.
+            await loop.run_in_executor(
+                self.simulator, lambda: engine.event_handler.handle_event(event)
+            )
+
+    async def draw(self) -> None:
+        loop = asyncio.get_running_loop()
+        frame = 1 / self.fps
+        next_frame = time.perf_counter()
+
+        while True:
+            if await loop.run_in_executor(self.renderer, self.render, frame):
+                # SDL wants this on the main thread.
+                self.context.present(self.console)
+
+            next_frame += frame
+            delay = next_frame - time.perf_counter()
+            if delay < 0:
+                # running behind. don't try to catch up on missed frames.
+                next_frame = time.perf_counter()
+                delay = 0
+            await asyncio.sleep(delay)
+
+    def render(self, timeout: float) -> bool:
+        """Render a frame to the console, on the drawing thread. Returns whether
+        there's a new one to present."""
+        engine = self.engine
+
+        # fast-forwards only get drawn once they're over. otherwise, if the
+        # simulation won't let go within `timeout` (waiting on the next level,
+        # say), keep what's on screen and try again next time.
+        if engine.fast_forwarding or not engine.lock.acquire(timeout=timeout):
+            return False
+        try:
+            # it could have started while we waited.
+            if engine.fast_forwarding:
+                return False
+            self.console.clear()
+            with engine.profiler.drawing():
+                engine.event_handler.on_render(console=self.console)
+            return True
+        finally:
+            engine.lock.release()
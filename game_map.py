@@ -1,17 +1,93 @@
 from __future__ import annotations
 
-from typing import Iterable, Iterator, Optional, TYPE_CHECKING
+from collections import deque
+from typing import AbstractSet, Any, Deque, Dict, Iterable, Optional, Set, Tuple, TYPE_CHECKING
 
 import numpy as np  # type: ignore
 from tcod.console import Console
 import tcod
 
 from entity import Actor, Facing
+from bitgrid import BitGrid
 import tile_types
+from watchers import Watchers
 
 if TYPE_CHECKING:
+    from camera import Camera
     from engine import Engine
     from entity import Entity
+    from pathfinding import RoomGraph
+
+
+# x1, y1, x2, y2. the far edges are exclusive, like a slice.
+Rect = Tuple[int, int, int, int]
+
+# the layers a snapshot can hold on to, and the change log that covers each.
+# see snapshot.py.
+SHARED_LAYERS = {
+    "tiles": "tile_changes",
+    "visible": "fov_changes",
+    "explored": "fov_changes",
+    "decal_ch": "decal_changes",
+    "decal_fg": "decal_changes",
+    "decal_names": "decal_changes",
+}
+
+
+def union(a: Optional[Rect], b: Optional[Rect]) -> Optional[Rect]:
+    """The smallest rect covering both. None counts as empty."""
+    if a is None:
+        return b
+    if b is None:
+        return a
+    return min(a[0], b[0]), min(a[1], b[1]), max(a[2], b[2]), max(a[3], b[3])
+
+
+def intersect(a: Rect, b: Rect) -> Optional[Rect]:
+    """The part of a that's inside b, or None if they don't overlap."""
+    x1, y1 = max(a[0], b[0]), max(a[1], b[1])
+    x2, y2 = min(a[2], b[2]), min(a[3], b[3])
+    if x1 >= x2 or y1 >= y2:
+        return None
+    return x1, y1, x2, y2
+
+
+class ChangeLog:
+    """A version counter for one layer of a map, and where it changed.
+
+    Every write bumps `version` and records the rect it touched. Anything
+    derived from the layer remembers the version it was built from, and asks
+    `changed_since` for the region it needs to bring up to date.
+    """
+
+    def __init__(self, width: int, height: int, history: int = 64):
+        self.width, self.height = width, height
+        self.version = 0
+        self.history: Deque[Tuple[int, Rect]] = deque(maxlen=history)
+
+    def mark(self, x1: int, y1: int, x2: int, y2: int) -> None:
+        self.version += 1
+        self.history.append((self.version, (x1, y1, x2, y2)))
+
+    def mark_all(self) -> None:
+        self.mark(0, 0, self.width, self.height)
+
+    def changed_since(self, version: int) -> Optional[Rect]:
+        """The region covering every change after `version`, or None if nothing changed."""
+        if version >= self.version:
+            return None
+
+        if not self.history or self.history[0][0] > version + 1:
+            # it's been long enough that we've forgotten. assume everything.
+            return 0, 0, self.width, self.height
+
+        dirty: Optional[Rect] = None
+        for changed, rect in reversed(self.history):
+            if changed <= version:
+                break
+            dirty = union(dirty, rect)
+
+        return dirty
 
 
 class GameMap:
@@ -20,163 +96,512 @@ class GameMap:
     ):
         self.engine = engine
         self.width, self.height = width, height
-        self.entities = set(entities)
-        self.tiles = np.full((width, height), fill_value=tile_types.wall, order="F")
+        self.entities: Set[Entity] = set()
+
+        # the same entities sorted by kind, and where the ones that matter for
+        # movement are. add, remove and move entities through the methods
+        # below (Entity.spawn/place/move do) to keep these in step.
+        self.live_actors: Set[Actor] = set()
+        self.corpses: Set[Actor] = set()
+        self.others: Set[Entity] = set()
+        self.actor_at: Dict[Tuple[int, int], Actor] = {}
+        self.blocking_at: Dict[Tuple[int, int], Entity] = {}
+        # where each entity was last filed under, in case it's moved since.
+        self._filed_at: Dict[Entity, Tuple[int, int]] = {}
+        # tile ids. see tile_types.palette for what they mean.
+        self.tiles = np.full(
+            (width, height), fill_value=tile_types.wall, dtype=np.uint8, order="F"
+        )
 
-        self.visible = np.full(
-            (width, height), fill_value=False, order="F"
-        )  # Tiles the player can currently see
-        self.explored = np.full(
-            (width, height), fill_value=False, order="F"
-        )  # Tiles the player has seen before
+        self.visible = BitGrid(width, height)  # Tiles the player can currently see
+        self.explored = BitGrid(width, height)  # Tiles the player has seen before
 
         self.vision_mode = False
         self.vision_row=0
 
+        # the rooms procgen laid out, if it left us any. used for long routes.
+        self.room_graph: Optional[RoomGraph] = None
+
+        # who changed what, and where. write tiles through set_tiles, the FOV
+        # through set_visible, move entities with Entity.move/place and turn
+        # them with Entity.face, and these stay up to date.
+        self.tile_changes = ChangeLog(width, height)
+        self.fov_changes = ChangeLog(width, height)
+        self.occupancy_changes = ChangeLog(width, height)
+        self.decal_changes = ChangeLog(width, height)
+
+        # things that are just part of the floor now, like corpses. drawn on
+        # top of the tiles, where decal_ch isn't 0.
+        self.decal_ch = np.zeros((width, height), dtype=np.int32, order="F")
+        self.decal_fg = np.zeros((width, height, 3), dtype=np.uint8, order="F")
+        # what's lying where, for the mouse over.
+        self.decal_names: Dict[Tuple[int, int], Tuple[str, ...]] = {}
+
+        # layers a snapshot is holding on to. they get copied before the next
+        # write, instead of every time a snapshot is taken.
+        self._shared: Set[str] = set()
+
+        # caches derived from the layers above, and the versions they're from.
+        self._walkable = np.empty((width, height), dtype=bool, order="F")
+        self._transparent = np.empty((width, height), dtype=bool, order="F")
+        self._tile_cache_version = -1
+
+        self._graphics = np.empty((width, height), dtype=tile_types.graphic_dt, order="F")
+        self._graphics_versions = (-1, -1, -1)
+        self._graphics_vision_limit = 0
+        # changes that were off screen when they happened, and still need drawing.
+        self._graphics_stale: Optional[Rect] = None
+
+        # bresenham lines for target locks, by (x1, y1, x2, y2) of the ends.
+        self._lines_of_fire: Dict[Tuple[int, int, int, int], np.ndarray] = {}
+
+        # how many enemies can see each tile. kept up to date by the entity
+        # methods below, like the registries. the overlay gets its own, for
+        # when it uses a different FOV algorithm to the AI. until it's drawn
+        # it only keeps a list of who's stale.
+        self.watchers = Watchers(self, "enemy")
+        self.overlay_watchers = Watchers(self, "overlay")
+
+        for entity in entities:
+            self.add_entity(entity)
+
+    def _refresh_tile_caches(self) -> None:
+        dirty = self.tile_changes.changed_since(self._tile_cache_version)
+        if dirty is not None:
+            x1, y1, x2, y2 = dirty
+            ids = self.tiles[x1:x2, y1:y2]
+            self._walkable[x1:x2, y1:y2] = tile_types.walkable[ids]
+            self._transparent[x1:x2, y1:y2] = tile_types.transparent[ids]
+
+        self._tile_cache_version = self.tile_changes.version
+
     @property
-    def actors(self) -> Iterator[Actor]:
-        """Iterate over this maps living actors."""
-        yield from (
-            entity
-            for entity in self.entities
-            if isinstance(entity, Actor) and entity.is_alive
+    def walkable(self) -> np.ndarray:
+        """True wherever the tile can be walked over. Don't write to this."""
+        self._refresh_tile_caches()
+        return self._walkable
+
+    @property
+    def transparent(self) -> np.ndarray:
+        """True wherever the tile doesn't block FOV. Don't write to this."""
+        self._refresh_tile_caches()
+        return self._transparent
+
+    def share_layers(self) -> Dict[str, Any]:
+        """The map's layers, for a snapshot to keep. Copy-on-write from here on."""
+        self._shared.update(SHARED_LAYERS)
+        return {name: getattr(self, name) for name in SHARED_LAYERS}
+
+    def restore_layers(self, layers: Dict[str, Any]) -> None:
+        """Go back to layers from share_layers. They stay shared."""
+        for name, layer in layers.items():
+            if getattr(self, name) is not layer:
+                setattr(self, name, layer)
+                getattr(self, SHARED_LAYERS[name]).mark_all()
+        self._shared.update(layers)
+
+    def _own(self, name: str) -> None:
+        """Make sure we have our own copy of a layer before writing to it."""
+        if name in self._shared:
+            self._shared.discard(name)
+            setattr(self, name, getattr(self, name).copy())
+
+    def set_tiles(self, index: Tuple, tile: int) -> None:
+        """Set the tiles at `index` (a pair of ints or slices) to `tile`."""
+        self._own("tiles")
+        self.tiles[index] = tile
+
+        x1, y1, x2, y2 = 0, 0, self.width, self.height
+        xs, ys = index
+        if isinstance(xs, slice):
+            x1, x2, _ = xs.indices(self.width)
+        else:
+            x1, x2 = xs, xs + 1
+        if isinstance(ys, slice):
+            y1, y2, _ = ys.indices(self.height)
+        else:
+            y1, y2 = ys, ys + 1
+
+        self.tile_changes.mark(x1, y1, x2, y2)
+
+    def set_visible(self, visible: np.ndarray) -> None:
+        """Replace what the player can see, and add it to what they've explored."""
+        new_visible = BitGrid.pack(visible)
+
+        # compare a byte (8 tiles) at a time. the dirty rect rounds out to
+        # whole bytes, which is fine.
+        changed = new_visible.words ^ self.visible.words
+        columns = np.flatnonzero(changed.any(axis=1))
+        if len(columns):
+            words = np.flatnonzero(changed.any(axis=0))
+            self.fov_changes.mark(
+                columns[0], words[0] * 8, columns[-1] + 1, min(self.height, words[-1] * 8 + 8)
+            )
+
+        self.visible = new_visible
+        # If a tile is "visible" it should be added to "explored".
+        self._own("explored")
+        self.explored |= new_visible
+
+    def occupancy_changed(self, x1: int, y1: int, x2: int, y2: int) -> None:
+        """Something that blocks (or used to) moved between these two tiles."""
+        self.occupancy_changes.mark(
+            min(x1, x2), min(y1, y2), max(x1, x2) + 1, max(y1, y2) + 1
         )
 
+    def is_walkable(self, x: int, y: int) -> bool:
+        return bool(tile_types.walkable[self.tiles[x, y]])
+
+    def _watches(self, entity: Entity) -> bool:
+        return entity in self.live_actors and entity is not self.engine.player
+
+    def _registry(self, entity: Entity) -> Set:
+        if isinstance(entity, Actor):
+            return self.live_actors if entity.is_alive else self.corpses
+        return self.others
+
+    def _index(self, entity: Entity) -> None:
+        xy = entity.x, entity.y
+        self._filed_at[entity] = xy
+        if entity in self.live_actors:
+            self.actor_at[xy] = entity
+        if entity.blocks_movement:
+            self.blocking_at[xy] = entity
+
+    def _unindex(self, entity: Entity) -> Tuple[int, int]:
+        xy = self._filed_at.pop(entity)
+        # only if it's still the one there. something could have been put on
+        # top of it.
+        if self.actor_at.get(xy) is entity:
+            del self.actor_at[xy]
+        if self.blocking_at.get(xy) is entity:
+            del self.blocking_at[xy]
+        return xy
+
+    def replace_entities(self, entities: Iterable[Entity]) -> None:
+        """Swap the whole set of entities out, e.g. for the ones in a snapshot."""
+        for registry in (
+            self.entities, self.live_actors, self.corpses, self.others,
+            self.actor_at, self.blocking_at, self._filed_at,
+        ):
+            registry.clear()
+
+        for entity in entities:
+            self.entities.add(entity)
+            self._registry(entity).add(entity)
+            self._index(entity)
+
+        # anything could be anywhere now.
+        self.occupancy_changes.mark_all()
+        watching = [entity for entity in self.live_actors if self._watches(entity)]
+        self.watchers.reset(watching)
+        self.overlay_watchers.reset(watching)
+
+    def add_entity(self, entity: Entity) -> None:
+        """Put an entity on this map, or re-file it after it changed (e.g. died.)"""
+        if entity in self.entities:
+            self.remove_entity(entity)
+
+        self.entities.add(entity)
+        self._registry(entity).add(entity)
+        self._index(entity)
+        self.occupancy_changed(entity.x, entity.y, entity.x, entity.y)
+        if self._watches(entity):
+            self.watchers.add(entity)
+            self.overlay_watchers.add(entity)
+
+    def remove_entity(self, entity: Entity) -> None:
+        if entity not in self.entities:
+            return
+
+        self.entities.remove(entity)
+        self.live_actors.discard(entity)
+        self.corpses.discard(entity)
+        self.others.discard(entity)
+        x, y = self._unindex(entity)
+        self.occupancy_changed(x, y, x, y)
+        self.watchers.remove(entity)
+        self.overlay_watchers.remove(entity)
+
+    def entity_moved(self, entity: Entity) -> None:
+        """Call after changing an entity's x and y."""
+        old_x, old_y = self._unindex(entity)
+        self._index(entity)
+        self.occupancy_changed(old_x, old_y, entity.x, entity.y)
+        self.watchers.changed(entity)
+        self.overlay_watchers.changed(entity)
+
+    def entity_turned(self, entity: Entity) -> None:
+        """Call after changing an entity's facing. Entity.face does."""
+        self.watchers.changed(entity)
+        self.overlay_watchers.changed(entity)
+
+    def bake_decal(self, entity: Entity) -> None:
+        """Take an entity off the map and leave its glyph painted on the floor.
+
+        For things that will never act or block again, so they stop costing
+        anything per turn or per frame.
+        """
+        self.remove_entity(entity)
+
+        for name in ("decal_ch", "decal_fg", "decal_names"):
+            self._own(name)
+
+        x, y = entity.x, entity.y
+        self.decal_ch[x, y] = ord(entity.char)
+        self.decal_fg[x, y] = entity.color
+        self.decal_names[x, y] = self.decal_names.get((x, y), ()) + (entity.name,)
+        self.decal_changes.mark(x, y, x + 1, y + 1)
+
+    @property
+    def actors(self) -> AbstractSet[Actor]:
+        """This maps living actors. Don't change it, and copy it if anything
+        might die while you're looping over it."""
+        return self.live_actors
+
     def get_blocking_entity_at_location(
         self, location_x: int, location_y: int,
     ) -> Optional[Entity]:
-        for entity in self.entities:
-            if (
-                entity.blocks_movement
-                and entity.x == location_x
-                and entity.y == location_y
-            ):
-                return entity
-
-        return None
+        return self.blocking_at.get((location_x, location_y))
 
     def get_actor_at_location(self, x: int, y: int) -> Optional[Actor]:
-        for actor in self.actors:
-            if actor.x == x and actor.y == y:
-                return actor
-
-        return None
+        return self.actor_at.get((x, y))
 
     def in_bounds(self, x: int, y: int) -> bool:
         """Return True if x and y are inside of the bounds of this map."""
         return 0 <= x < self.width and 0 <= y < self.height
 
-    def render(self, console: Console) -> None:
+    def vision_limit(self, window: Rect) -> int:
+        """The map row the vision sweep has reached. Rows above it use the vision colors.
+
+        vision_row counts rows down from the top of the window, so the sweep
+        takes the same time however big the map is.
+        """
+        x1, y1, x2, y2 = window
+        if self.vision_row <= 0:
+            return 0
+        if self.vision_row >= y2 - y1:
+            return self.height
+        return y1 + self.vision_row
+
+    def refresh_graphics(self, window: Rect) -> np.ndarray:
+        """Bring the map's tile graphics inside `window` up to date, and return them.
+
+        Only the parts where the tiles or the FOV changed since last time, or
+        that the vision sweep passed over, get redrawn. Changes outside the
+        window are left until it scrolls over them.
+        """
+        tile_version, fov_version, decal_version = self._graphics_versions
+        dirty = union(
+            self.tile_changes.changed_since(tile_version),
+            self.fov_changes.changed_since(fov_version),
+        )
+        dirty = union(dirty, self.decal_changes.changed_since(decal_version))
+        dirty = union(dirty, self._graphics_stale)
+
+        vision_limit = self.vision_limit(window)
+        if vision_limit != self._graphics_vision_limit:
+            top, bottom = sorted((vision_limit, self._graphics_vision_limit))
+            dirty = union(dirty, (0, top, self.width, bottom))
+
+        self._graphics_stale = None
+        if dirty is not None:
+            on_screen = intersect(dirty, window)
+            if on_screen != dirty:
+                # we'll redraw the on screen part of this again next frame,
+                # but that's still never more than a screenful.
+                self._graphics_stale = dirty
+
+        if dirty is not None and on_screen is not None:
+            x1, y1, x2, y2 = on_screen
+
+            # rows above the sweep are drawn with the vision mode colors. the
+            # lookup table takes care of visible/explored/shroud.
+            vision = (np.arange(y1, y2) < vision_limit).astype(np.uint8)
+
+            self._graphics[x1:x2, y1:y2] = tile_types.render_lut[
+                vision[np.newaxis, :],
+                self.visible.unpack(x1, y1, x2, y2).view(np.uint8),
+                self.explored.unpack(x1, y1, x2, y2).view(np.uint8),
+                self.tiles[x1:x2, y1:y2],
+            ]
+
+            graphics = self._graphics[x1:x2, y1:y2]
+            decals = self.decal_ch[x1:x2, y1:y2] != 0
+            graphics["ch"][decals] = self.decal_ch[x1:x2, y1:y2][decals]
+            graphics["fg"][decals] = self.decal_fg[x1:x2, y1:y2][decals]
+
+        self._graphics_versions = (
+            self.tile_changes.version,
+            self.fov_changes.version,
+            self.decal_changes.version,
+        )
+        self._graphics_vision_limit = vision_limit
+
+        x1, y1, x2, y2 = window
+        return self._graphics[x1:x2, y1:y2]
+
+    def render(self, console: Console, camera: Camera) -> None:
         """
-        Renders the map.
+        Renders the part of the map the camera is looking at.
 
         If a tile is in the "visible" array, then draw it with the "light" colors.
         If it isn't, but it's in the "explored" array, then draw it with the "dark" colors.
-        Otherwise, the default is "SHROUD".
+        Otherwise, the default is "SHROUD". See tile_types.render_lut.
         """
+        window = camera.bounds
+        x1, y1, x2, y2 = window
+        sx, sy = camera.to_screen(x1, y1)
 
         # swap color modes depending on mode
         # this is an animation trick. each time we render, move down a row.
-        if self.vision_mode and self.vision_row <= self.height:
+        if self.vision_mode and self.vision_row <= camera.height:
             self.vision_row += 4
         elif self.vision_row > 0:
             self.vision_row -= 4
 
         # clamp it
-        self.vision_row = min(self.vision_row, self.height)
+        self.vision_row = min(self.vision_row, camera.height)
         self.vision_row = max(self.vision_row, 0)
 
-        # then we do rendering in two passes. 0 to current row, then current_row
-        # to rest. so in vision mode, it's 0:0 and we dont' render with vision
-        # colors.
-        if self.vision_row > 0:
-            tiles = np.select(
-                condlist=[self.visible, self.explored],
-                choicelist=[self.tiles["light_vision"], self.tiles["dark_vision"]],
-                default=tile_types.SHROUD,
-            )
-
-            console.tiles_rgb[0 : self.width, 0 : self.vision_row] = tiles[0:self.width,0:self.vision_row]
+        console.tiles_rgb[sx : sx + x2 - x1, sy : sy + y2 - y1] = self.refresh_graphics(window)
 
-        tiles = np.select(
-            condlist=[self.visible, self.explored],
-            choicelist=[self.tiles["light"], self.tiles["dark"]],
-            default=tile_types.SHROUD,
-        )
+        if self.vision_mode:
+            self.render_vision(console, camera)
+            self.render_lines_of_fire(console, camera)
 
-        # print(f'tiles.shape={tiles.shape}  tiles.shape[][]={tiles[:][self.vision_row:self.height].shape} console.shape={console.tiles_rgb[0 : self.width, self.vision_row : self.height].shape} from {(self.width, self.height)} + row {self.vision_row}')
+        self.render_entities(console, camera)
 
-        console.tiles_rgb[0 : self.width, self.vision_row : self.height] = tiles[0:self.width,self.vision_row:self.height]
+    def render_entities(self, console: Console, camera: Camera) -> None:
+        """Draw every entity on screen with a single write to the console."""
+        x1, y1, x2, y2 = camera.bounds
 
-        entities_sorted_for_rendering = sorted(
-            self.entities, key=lambda x: x.render_order.value
+        # for now, always render all enemies. this will make my life easier.
+        on_screen = sorted(
+            (entity for entity in self.entities if x1 <= entity.x < x2 and y1 <= entity.y < y2),
+            key=lambda x: x.render_order.value,
+        )
+        if not on_screen:
+            return
+
+        xs = np.array([entity.x for entity in on_screen]) - x1
+        ys = np.array([entity.y for entity in on_screen]) - y1
+
+        # when things share a tile, the last one in render order wins, same as
+        # drawing them one at a time would. find the last of each tile.
+        cell = xs * (y2 - y1) + ys
+        _, last = np.unique(cell[::-1], return_index=True)
+        top = len(on_screen) - 1 - last
+
+        sx, sy = camera.to_screen(x1, y1)
+        console.ch[xs[top] + sx, ys[top] + sy] = [ord(on_screen[i].char) for i in top]
+        console.fg[xs[top] + sx, ys[top] + sy] = [on_screen[i].color for i in top]
+
+    def line_of_fire(self, entity: Actor) -> np.ndarray:
+        """The cells between an enemy and whatever it's locked onto, as an (n, 2) array."""
+        key = (entity.x, entity.y, entity.target_lock.x, entity.target_lock.y)
+        cells = self._lines_of_fire.get(key)
+        if cells is None:
+            # drop the enemy's own cell.
+            cells = tcod.los.bresenham(key[:2], key[2:])[1:]
+            self._lines_of_fire[key] = cells
+        return cells
+
+    def render_lines_of_fire(self, console: Console, camera: Camera) -> None:
+        """Draw a red line from every target locked enemy to its target."""
+        locked = [
+            entity for entity in self.actors
+            if not entity.is_player and entity.target_lock is not None
+        ]
+
+        # lines only get reused while neither end moves, so forget the rest.
+        lines = {entity: self.line_of_fire(entity) for entity in locked}
+        used = {(e.x, e.y, e.target_lock.x, e.target_lock.y) for e in locked}
+        for key in self._lines_of_fire.keys() - used:
+            del self._lines_of_fire[key]
+
+        if not lines:
+            return
+
+        cells = np.concatenate(list(lines.values()))
+        xs, ys = cells[:, 0], cells[:, 1]
+
+        x1, y1, x2, y2 = camera.bounds
+        tiles = self.tiles[np.clip(xs, 0, self.width - 1), np.clip(ys, 0, self.height - 1)]
+        draw = (
+            (x1 <= xs) & (xs < x2) & (y1 <= ys) & (ys < y2)
+            & (tile_types.walkable[tiles] | tile_types.transparent[tiles])
         )
 
-        for entity in entities_sorted_for_rendering:
-
-            # for now, always render all enemies. this will make my life easier.
-            # if self.visible[entity.x, entity.y]:
-            console.print(
-                x=entity.x, y=entity.y, string=entity.char, fg=entity.color
-            )
-
-            if self.vision_mode:
-                # in case I want to bring back facing
-                # console.print(x=entity.x+fx, y=entity.y+fy, string='*', fg=entity.color)
-
-                # now print their facing
-                # not sure where to do this but need to map facing to dx/dy.
-                LASER_SIGHT_DISTANCE = 4
-                # if we're target locked, don't draw facing, draw direct connection
-                # if not entity.is_player and entity.target_lock == None:
-                #     (fx, fy) = Facing.get_pos(entity.facing)
-                #
-                #     # get delta to destination
-                #     (dx, dy) = (LASER_SIGHT_DISTANCE*fx, LASER_SIGHT_DISTANCE*fy)
-                #
-                #     cells = tcod.los.bresenham((entity.x, entity.y),
-                #         (entity.x + dx, entity.y + dy))
-                #
-                #     cells = np.delete(cells, 0, 0)
-                #
-                #     discount = 0.5
-                #     for cell in cells:
-                #         tile = self.tiles[cell[0]][cell[1]]
-                #
-                #         if tile['walkable'] or tile['transparent']:
-                #             console.print(cell[0], cell[1], string=' ', bg=(int(255*discount), 0, 0))
-                #             discount -= 0.5/LASER_SIGHT_DISTANCE
-
-                if not entity.is_player and entity.target_lock != None:
-                    cells = tcod.los.bresenham((entity.x, entity.y),
-                        (entity.target_lock.x, entity.target_lock.y))
-
-                    cells = np.delete(cells, 0, 0)
-
-                    for cell in cells:
-                        tile = self.tiles[cell[0]][cell[1]]
-
-                        if tile['walkable'] or tile['transparent']:
-                            console.print(cell[0], cell[1], string=' ', bg=(255, 0, 0))
-                elif not entity.is_player and entity.target_lock == None:
-                    # if they don't have a lock, paint their entire vision
-                    # only compute this for tiles the player can see
-                    cells = entity.get_visibility(self.tiles["transparent"])
-
-
-                    # this is an ndarray with T/F in it. we need to AND this
-                    # with a matching size array that has just a white with
-                    # alpha channel set. then overlay the whole thing.
-                    vision = np.full((self.width, self.height, 3), (255, 0, 0))
-
-                    # I'm not honestly sure why I have to invert this. Need to see if fix is in get_visibility.
-                    vision[np.invert(cells)] = [0, 0, 0]
-                    vision[np.invert(self.visible[:])] = [0,0,0]
-
-                    vision_console = Console(self.width, self.height, order="F")
-                    vision_console.bg_alpha=0.3
-
-                    vision_console.bg[:] = vision
-
-                    # no params since we're fully overlaying the whole screen
-                    vision_console.blit(console, bg_alpha=0.2)
+        sx, sy = camera.to_screen(x1, y1)
+        xs, ys = xs[draw] - x1 + sx, ys[draw] - y1 + sy
+        console.ch[xs, ys] = ord(" ")
+        console.bg[xs, ys] = (255, 0, 0)
+
+        # in case I want to bring back facing
+        # console.print(x=entity.x+fx, y=entity.y+fy, string='*', fg=entity.color)
+
+        # now print their facing
+        # not sure where to do this but need to map facing to dx/dy.
+        # LASER_SIGHT_DISTANCE = 4
+        # if we're target locked, don't draw facing, draw direct connection
+        # if not entity.is_player and entity.target_lock == None:
+        #     (fx, fy) = Facing.get_pos(entity.facing)
+        #
+        #     # get delta to destination
+        #     (dx, dy) = (LASER_SIGHT_DISTANCE*fx, LASER_SIGHT_DISTANCE*fy)
+        #
+        #     cells = tcod.los.bresenham((entity.x, entity.y),
+        #         (entity.x + dx, entity.y + dy))
+        #
+        #     cells = np.delete(cells, 0, 0)
+        #
+        #     discount = 0.5
+        #     for cell in cells:
+        #         tile = self.tiles[cell[0]][cell[1]]
+        #
+        #         if tile['walkable'] or tile['transparent']:
+        #             console.print(cell[0], cell[1], string=' ', bg=(int(255*discount), 0, 0))
+        #             discount -= 0.5/LASER_SIGHT_DISTANCE
+
+    def render_vision(self, console: Console, camera: Camera) -> None:
+        """Tint everything unlocked enemies can see, that the player can see too.
+
+        The more of them watching a tile, the redder it gets.
+        """
+        window = camera.bounds
+        x1, y1, x2, y2 = window
+        sx, sy = camera.to_screen(x1, y1)
+
+        # the AI's, unless the overlay's been given a different algorithm.
+        watchers = self.watchers
+        if self.engine.overlay_fov_algorithm != self.engine.enemy_fov_algorithm:
+            watchers = self.overlay_watchers
+
+        watching = watchers.window(*window).copy()
+
+        # locked enemies get a line of fire instead, so take theirs back out.
+        for entity in self.actors:
+            if entity.target_lock is None or entity.is_player:
+                continue
+            vision = watchers.cells(entity)
+            if vision is None:
+                continue  # it's not seeing anything in the window.
+            (vx1, vy1, vx2, vy2), cells = vision
+            overlap = intersect((vx1, vy1, vx2, vy2), window)
+            if overlap is None:
+                continue
+            ox1, oy1, ox2, oy2 = overlap
+            watching[ox1 - x1:ox2 - x1, oy1 - y1:oy2 - y1] -= cells[
+                ox1 - vx1:ox2 - vx1, oy1 - vy1:oy2 - vy1
+            ]
+
+        # only the tiles we can see too.
+        tinted = (watching > 0) & self.visible.unpack(*window)
+        if not tinted.any():
+            return
+
+        # each watcher mixes in another 20% red.
+        alpha = (1 - 0.8 ** watching[tinted])[:, np.newaxis]
+        bg = console.bg[sx : sx + x2 - x1, sy : sy + y2 - y1]
+        bg[tinted] = bg[tinted] * (1 - alpha) + np.array((255, 0, 0)) * alpha
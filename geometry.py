@@ -0,0 +1,127 @@
+"""Facings, and the geometry that goes with them, as lookup tables.
+
+Everything here works on single values, and most of it on whole arrays of
+deltas at once, so the AI and the vision code can resolve lots of facings in
+one call.
+"""
+from __future__ import annotations
+
+from enum import auto, Enum
+from functools import lru_cache
+import math
+from typing import Tuple
+
+import numpy as np  # type: ignore
+
+
+class Facing(Enum):
+    NW = auto()
+    N = auto()
+    NE = auto()
+    E = auto()
+    SE = auto()
+    S = auto()
+    SW = auto()
+    W = auto()
+
+    # kept for the code that already asks the enum. they're lookups now.
+    @classmethod
+    def get_pos(cls, f: Facing) -> Tuple[int, int]:
+        return OFFSETS[f]
+
+    @classmethod
+    def get_angle(cls, f: Facing) -> float:
+        return ANGLES[f]
+
+    @classmethod
+    def get_direction(cls, x1: int, y1: int, x2: int = 0, y2: int = 0) -> Facing:
+        return direction(x2 - x1, y2 - y1)
+
+
+# in enum order. the arrays below are indexed the same way, and a facing's
+# index is facing.value - 1, since auto() starts at 1.
+FACINGS: Tuple[Facing, ...] = tuple(Facing)
+
+OFFSET_ARRAY = np.array(
+    [(-1, -1), (0, -1), (1, -1), (1, 0), (1, 1), (0, 1), (-1, 1), (-1, 0)], dtype=np.int8
+)
+OFFSETS = {f: (int(dx), int(dy)) for f, (dx, dy) in zip(FACINGS, OFFSET_ARRAY)}
+
+# where each facing's vision cone points. x and y really are swapped, the cone
+# measures its angles the same way.
+ANGLES = {f: math.atan2(*OFFSETS[f]) for f in FACINGS}
+ANGLE_ARRAY = np.array([ANGLES[f] for f in FACINGS])
+
+# which way atan2(dy, dx) points, in eighths of a turn clockwise from east
+# (y is down), as indexes into FACINGS.
+SECTORS = np.array(
+    [f.value - 1 for f in (Facing.E, Facing.SE, Facing.S, Facing.SW,
+                           Facing.W, Facing.NW, Facing.N, Facing.NE)],
+    dtype=np.int8,
+)
+
+# deltas this far out on either axis come straight out of a table.
+LUT_RADIUS = 32
+
+
+def _sectors(dx: np.ndarray, dy: np.ndarray) -> np.ndarray:
+    """Facing indexes for any deltas, the slow way. 0, 0 faces east."""
+    eighths = np.floor((np.arctan2(dy, dx) + math.pi / 8) / (math.pi / 4)).astype(np.int64)
+    return SECTORS[eighths % 8]
+
+
+_grid = np.arange(-LUT_RADIUS, LUT_RADIUS + 1)
+DIRECTION_LUT = _sectors(_grid[:, np.newaxis], _grid[np.newaxis, :])
+del _grid
+# the same, as plain lists of Facings. indexing numpy one cell at a time is
+# slower than the atan2 it's replacing.
+_DIRECTION_ROWS = [[FACINGS[i] for i in row] for row in DIRECTION_LUT.tolist()]
+
+
+def direction(dx: int, dy: int) -> Facing:
+    """The facing that points the closest to dx, dy."""
+    if -LUT_RADIUS <= dx <= LUT_RADIUS and -LUT_RADIUS <= dy <= LUT_RADIUS:
+        return _DIRECTION_ROWS[dx + LUT_RADIUS][dy + LUT_RADIUS]
+    return FACINGS[int(_sectors(np.asarray(dx), np.asarray(dy)))]
+
+
+def directions(dx: np.ndarray, dy: np.ndarray) -> np.ndarray:
+    """`direction` for arrays of deltas, as indexes into FACINGS."""
+    dx, dy = np.broadcast_arrays(np.asarray(dx), np.asarray(dy))
+    near = (np.abs(dx) <= LUT_RADIUS) & (np.abs(dy) <= LUT_RADIUS)
+    if near.all():
+        return DIRECTION_LUT[dx + LUT_RADIUS, dy + LUT_RADIUS]
+
+    result = _sectors(dx, dy)
+    result[near] = DIRECTION_LUT[dx[near] + LUT_RADIUS, dy[near] + LUT_RADIUS]
+    return result
+
+
+def offsets(indexes: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+    """The one step dx, dy arrays for an array of facing indexes."""
+    steps = OFFSET_ARRAY[indexes]
+    return steps[..., 0], steps[..., 1]
+
+
+@lru_cache(maxsize=None)
+def cone(facing: Facing, front: int, side: int, back: int) -> np.ndarray:
+    """The cells within sight of the middle cell, when it faces `facing`.
+
+    Sight goes `front` cells within 45 degrees of the facing, `side` cells
+    within 90, and `back` cells the rest of the way round. Index it with
+    [dx + front, dy + front]. Read only, it's shared.
+    """
+    span = np.arange(-front, front + 1)
+    # deltas from the cell to the middle, like the angles in ANGLES.
+    to_x, to_y = -span[:, np.newaxis], -span[np.newaxis, :]
+
+    distance = np.sqrt(to_x ** 2 + to_y ** 2).astype(np.int64)
+    angle = np.arctan2(to_x, to_y) + math.pi
+    off = angle - ANGLES[facing]
+    angle_distance = np.minimum(np.abs(off), 2 * math.pi - off)
+
+    reach = np.where(angle_distance < math.pi / 4, front,
+                     np.where(angle_distance < math.pi / 2, side, back))
+    stencil = distance <= reach
+    stencil.flags.writeable = False
+    return stencil
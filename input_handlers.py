@@ -4,7 +4,7 @@ from typing import Optional, TYPE_CHECKING
 
 import tcod
 
-from actions import Action, BumpAction, EscapeAction, WaitAction
+from actions import Action, BumpAction, DescendAction, EscapeAction, WaitAction
 
 if TYPE_CHECKING:
     from engine import Engine
@@ -46,6 +46,9 @@ WAIT_KEYS = {
     tcod.event.K_CLEAR,
 }
 
+# how long 'r' waits for, unless something interrupts.
+REST_TURNS = 100
+
 
 class EventHandler(tcod.event.EventDispatch[Action]):
     def __init__(self, engine: Engine):
@@ -54,11 +57,22 @@ class EventHandler(tcod.event.EventDispatch[Action]):
     def handle_events(self, context: tcod.context.Context) -> None:
         for event in tcod.event.wait():
             context.convert_event(event)
-            self.dispatch(event)
+            self.handle_event(event)
+
+    def handle_event(self, event: tcod.event.Event) -> None:
+        """Deal with one event, already converted to tile coordinates.
+
+        Actions it produces get performed right away. Doesn't need the
+        context, so it can run off the main thread.
+        """
+        action = self.dispatch(event)
+        if action is not None:
+            action.perform()
 
     def ev_mousemotion(self, event: tcod.event.MouseMotion) -> None:
-        if self.engine.game_map.in_bounds(event.tile.x, event.tile.y):
-            self.engine.mouse_location = event.tile.x, event.tile.y
+        x, y = self.engine.camera.to_map(event.tile.x, event.tile.y)
+        if self.engine.camera.contains(x, y):
+            self.engine.mouse_location = x, y
 
     def ev_quit(self, event: tcod.event.Quit) -> Optional[Action]:
         raise SystemExit()
@@ -72,17 +86,16 @@ class MainGameEventHandler(EventHandler):
 
         for event in tcod.event.get():
             context.convert_event(event)
+            self.handle_event(event)
 
-            action = self.dispatch(event)
-
-            if action is None:
-                continue
-
-            action.perform()
+    def handle_event(self, event: tcod.event.Event) -> None:
+        action = self.dispatch(event)
 
-            self.engine.handle_enemy_turns()
+        if action is None:
+            return
 
-            self.engine.update_fov()  # Update the FOV before the players next action.
+        # the player's action, then everyone else's, then the FOV.
+        self.engine.play_turn(action)
 
     def ev_keydown(self, event: tcod.event.KeyDown) -> Optional[Action]:
         action: Optional[Action] = None
@@ -91,11 +104,19 @@ class MainGameEventHandler(EventHandler):
 
         player = self.engine.player
 
-        if key in MOVE_KEYS:
+        if key == tcod.event.K_PERIOD and event.mod & tcod.event.KMOD_SHIFT:
+            # '>'. there are no stairs yet, so you can go down from anywhere.
+            action = DescendAction(player)
+        elif key in MOVE_KEYS:
             dx, dy = MOVE_KEYS[key]
             action = BumpAction(player, dx, dy)
         elif key in WAIT_KEYS:
             action = WaitAction(player)
+        elif key == tcod.event.K_r:
+            # runs all the turns itself.
+            self.engine.rest(REST_TURNS)
+        elif key == tcod.event.K_BACKSPACE:
+            self.engine.rewind()
 
         elif key == tcod.event.K_ESCAPE:
             action = EscapeAction(player)
@@ -104,6 +125,15 @@ class MainGameEventHandler(EventHandler):
             self.engine.game_map.vision_mode = not self.engine.game_map.vision_mode
         elif key == tcod.event.K_v:
             self.engine.event_handler = HistoryViewer(self.engine)
+        elif key == tcod.event.K_F3:
+            # the performance overlay, or with shift, memory tracing for it.
+            if event.mod & tcod.event.KMOD_SHIFT:
+                self.engine.perf.toggle_tracemalloc()
+            else:
+                self.engine.perf.toggle()
+        elif key == tcod.event.K_F9:
+            # start (or stop early) a profile of the next few turns.
+            self.engine.profiler.toggle()
 
         # No valid key was pressed
         return action
@@ -112,16 +142,18 @@ class MainGameEventHandler(EventHandler):
         key = event.sym
         pass
 
-class GameOverEventHandler(EventHandler):
-    def handle_events(self, context: tcod.context.Context) -> None:
-        for event in tcod.event.wait():
-            action = self.dispatch(event)
+    def ev_mousebuttondown(self, event: tcod.event.MouseButtonDown) -> Optional[Action]:
+        # click somewhere you've been to walk there.
+        if event.button != tcod.event.BUTTON_LEFT:
+            return None
 
-            if action is None:
-                continue
+        x, y = self.engine.camera.to_map(event.tile.x, event.tile.y)
+        if self.engine.camera.contains(x, y) and self.engine.game_map.explored[x, y]:
+            self.engine.travel(x, y)
 
-            action.perform()
+        return None
 
+class GameOverEventHandler(EventHandler):
     def ev_keydown(self, event: tcod.event.KeyDown) -> Optional[Action]:
         action: Optional[Action] = None
 
@@ -129,6 +161,9 @@ class GameOverEventHandler(EventHandler):
 
         if key == tcod.event.K_ESCAPE:
             action = EscapeAction(self.engine.player)
+        elif key == tcod.event.K_BACKSPACE:
+            # take back whatever got you killed.
+            self.engine.rewind()
 
         # No valid key was pressed
         return action
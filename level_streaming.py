@@ -0,0 +1,100 @@
+from __future__ import annotations
+
+import copy
+import multiprocessing
+import random
+from collections import deque
+from concurrent.futures import Future, ProcessPoolExecutor
+from typing import Any, Deque, Dict, Optional, Tuple, TYPE_CHECKING
+
+if TYPE_CHECKING:
+    from engine import Engine
+    from game_map import GameMap
+
+
+class LevelData:
+    """A generated level, entities, room graph and all, with no engine attached.
+
+    The worker builds the whole GameMap, so the main thread only has to hand
+    it the engine and put the player on it. Nothing in here points back at an
+    engine, so it's all that crosses between processes.
+    """
+
+    def __init__(self, game_map: GameMap, player_start: Tuple[int, int]):
+        self.game_map = game_map
+        self.player_start = player_start
+
+    @classmethod
+    def from_game_map(cls, game_map: GameMap) -> LevelData:
+        """Take the map away from its engine, and the engine's player off it."""
+        player = game_map.engine.player
+        game_map.remove_entity(player)
+        game_map.engine = None
+        return cls(game_map, (player.x, player.y))
+
+    def build(self, engine: Engine) -> GameMap:
+        """Hand the map to the engine, with the engine's player placed on it."""
+        game_map = self.game_map
+        game_map.engine = engine
+        engine.player.place(*self.player_start, game_map)
+        return game_map
+
+
+def generate_level(seed: int, params: Dict[str, Any]) -> LevelData:
+    """Generate a level from scratch. This is what runs in the worker process."""
+    import entity_factories
+    from engine import Engine
+    from procgen import generate_dungeon
+
+    random.seed(seed)
+
+    # procgen wants an engine with a player to place. these are stand-ins.
+    engine = Engine(player=copy.deepcopy(entity_factories.player))
+    game_map = generate_dungeon(engine=engine, **params)
+
+    return LevelData.from_game_map(game_map)
+
+
+class LevelStreamer:
+    """Generates the next level(s) in a worker process while this one is played.
+
+    `params` are the keyword arguments for `generate_dungeon`, minus the engine.
+    Levels are seeded from `seed`, so the same seed gives the same run of levels.
+    """
+
+    def __init__(self, params: Dict[str, Any], lookahead: int = 1, seed: Optional[int] = None):
+        self.params = params
+        self.lookahead = lookahead
+        self.rng = random.Random(seed)
+
+        self.executor: Optional[ProcessPoolExecutor] = None
+        self.pending: Deque[Future] = deque()
+
+    def prefetch(self) -> None:
+        """Make sure the next `lookahead` levels are being generated."""
+        if self.executor is None:
+            # spawn rather than fork. forking a process that has a window
+            # open is asking for trouble.
+            self.executor = ProcessPoolExecutor(
+                max_workers=1, mp_context=multiprocessing.get_context("spawn")
+            )
+
+        while len(self.pending) < self.lookahead:
+            seed = self.rng.getrandbits(32)
+            self.pending.append(self.executor.submit(generate_level, seed, self.params))
+
+    def next_level(self, engine: Engine) -> GameMap:
+        """Swap in the next level. Only blocks if it isn't finished yet."""
+        self.prefetch()
+        data = self.pending.popleft().result()
+
+        # get started on the one after.
+        self.prefetch()
+
+        return data.build(engine)
+
+    def close(self) -> None:
+        if self.executor is not None:
+            self.executor.shutdown(wait=False, cancel_futures=True)
+            self.executor = None
+        self.pending.clear()
@@ -1,18 +1,38 @@
 #!/usr/bin/env python3
+import time
+
+# before the heavy imports, so the startup timing covers them.
+STARTED = time.perf_counter()
+
+from concurrent.futures import ThreadPoolExecutor
 import copy
+import os
 
 import tcod
 
 import color
 from engine import Engine
 import entity_factories
+from game_loop import GameLoop
 from procgen import generate_dungeon
+from profiling import PhaseTimer
+import tracing
 
 
 def main() -> None:
+    # SNEAK_STARTUP_PROFILE=1 prints how long each part of startup took.
+    startup = PhaseTimer(bool(os.environ.get("SNEAK_STARTUP_PROFILE")), start=STARTED)
+    startup.mark("imports")
+
+    tracing.configure_from_env()
+
     screen_width = 160
     screen_height = 100
 
+    # the map can be bigger than this, the camera scrolls to follow the player.
+    viewport_width = 160
+    viewport_height = 86
+
     map_width = 160
     map_height = 86
 
@@ -22,47 +42,78 @@ def main() -> None:
 
     max_monsters_per_room = 1
 
+    # symmetric FOV makes the enemy detection prefilter exact.
+    symmetric_fov = True
+
     tileset = tcod.tileset.load_tilesheet(
         "dejavu10x10_gs_tc.png", 32, 8, tcod.tileset.CHARMAP_TCOD
     )
+    startup.mark("tileset")
 
     player = copy.deepcopy(entity_factories.player)
     player.is_player = True
 
-    engine = Engine(player=player)
+    engine = Engine(
+        player=player,
+        symmetric_fov=symmetric_fov,
+        viewport_width=viewport_width,
+        viewport_height=viewport_height,
+    )
 
-    engine.game_map = generate_dungeon(
+    level_params = dict(
         max_rooms=max_rooms,
         room_min_size=room_min_size,
         room_max_size=room_max_size,
         map_width=map_width,
         map_height=map_height,
         max_monsters_per_room=max_monsters_per_room,
-        engine=engine,
     )
 
-    engine.update_fov()
-
-    engine.message_log.add_message(
-        "Begin the run.", color.welcome_text
-    )
+    # make the first level while the window opens. tcod lets go of the GIL
+    # while it's talking to SDL, so the two really do overlap.
+    generator = ThreadPoolExecutor(max_workers=1)
+    first_level = generator.submit(generate_dungeon, engine=engine, **level_params)
+    generator.shutdown(wait=False)
 
     with tcod.context.new_terminal(
         screen_width,
         screen_height,
         tileset=tileset,
         title="sneak",
-        vsync=True,
+        # the game loop paces frames itself. waiting on vsync as well would
+        # hold up input while it waits.
+        vsync=False,
     ) as context:
+        startup.mark("window")
+
+        engine.game_map = first_level.result()
+        startup.mark("waiting for the dungeon")
+
+        engine.update_fov()
+
+        engine.message_log.add_message(
+            "Begin the run.", color.welcome_text
+        )
+
         root_console = tcod.Console(screen_width, screen_height, order="F")
-        while True:
-            root_console.clear()
+        try:
             engine.event_handler.on_render(console=root_console)
             context.present(root_console)
-            engine.render(root_console)
+            startup.mark("first frame")
+            startup.report()
+
+            # later levels get generated in the background while this one is
+            # played. the worker is a whole new python importing everything,
+            # so don't start it until we're up and running.
+            from level_streaming import LevelStreamer
 
-            engine.event_handler.handle_events(context)
+            engine.level_streamer = LevelStreamer(level_params)
+            engine.level_streamer.prefetch()
 
+            GameLoop(engine, context, root_console).run()
+        finally:
+            if engine.level_streamer is not None:
+                engine.level_streamer.close()
 
 
 if __name__ == "__main__":
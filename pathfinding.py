@@ -0,0 +1,324 @@
+from __future__ import annotations
+
+from typing import Iterable, List, Optional, Sequence, Tuple, TYPE_CHECKING
+
+import numpy as np  # type: ignore
+import tcod
+
+import tile_types
+
+if TYPE_CHECKING:
+    from game_map import GameMap
+
+
+# how far past a blockage we'll look for a spot to rejoin the old route.
+REPAIR_LOOKAHEAD = 16
+# how much room to give a detour around the blocked stretch.
+REPAIR_MARGIN = 3
+
+# long trips across open ground get searched in hops of about this many tiles.
+LEG_LENGTH = 24
+
+# what it costs to path through a tile something is standing on, on top of
+# the usual. see BaseAI.get_path_to.
+BLOCKED_COST = 10
+
+
+class Path:
+    """A route as an (n, 2) array of points, plus a cursor for the next step.
+
+    Stepping along just moves the cursor, and a blocked stretch can be swapped
+    out without rebuilding the rest of the route.
+    """
+
+    def __init__(self, points=()):
+        self.points = np.asarray(points, dtype=np.int32).reshape(-1, 2)
+        self.cursor = 0
+
+    def __len__(self) -> int:
+        return len(self.points) - self.cursor
+
+    def __bool__(self) -> bool:
+        return self.cursor < len(self.points)
+
+    def __getitem__(self, index: int) -> Tuple[int, int]:
+        if index < 0:
+            index += len(self)
+        x, y = self.points[self.cursor + index]
+        return int(x), int(y)
+
+    @property
+    def remaining(self) -> np.ndarray:
+        """The points still ahead of us, as a view."""
+        return self.points[self.cursor:]
+
+    def pop(self) -> Tuple[int, int]:
+        """Consume and return the next step."""
+        step = self[0]
+        self.cursor += 1
+        return step
+
+    def splice(self, end: int, segment: np.ndarray) -> None:
+        """Replace the next `end` points with `segment`."""
+        self.points = np.concatenate(
+            (np.asarray(segment, dtype=np.int32).reshape(-1, 2),
+             self.points[self.cursor + end:])
+        )
+        self.cursor = 0
+
+
+def repair_path(path: Path, game_map: GameMap, origin: Tuple[int, int]) -> bool:
+    """Re-plan just the blocked stretch at the front of `path`.
+
+    Finds the first point past the blockage that's clear, then searches for a
+    way from `origin` to it inside a small box around the two, and splices the
+    detour in. Returns False if there's no detour nearby, in which case the
+    caller has to plan the whole route again.
+    """
+    blocked = game_map.blocking_at
+
+    ahead = path.remaining[:REPAIR_LOOKAHEAD].tolist()
+    for rejoin, (rx, ry) in enumerate(ahead):
+        if rejoin > 0 and (rx, ry) not in blocked:
+            break
+    else:
+        return False  # blocked all the way to the end (or as far as we look.)
+
+    ox, oy = origin
+    x0 = max(0, min(ox, rx) - REPAIR_MARGIN)
+    y0 = max(0, min(oy, ry) - REPAIR_MARGIN)
+    x1 = min(game_map.width, max(ox, rx) + REPAIR_MARGIN + 1)
+    y1 = min(game_map.height, max(oy, ry) + REPAIR_MARGIN + 1)
+
+    cost = tile_types.walkable[game_map.tiles[x0:x1, y0:y1]].astype(np.int8)
+    for x, y in blocked:
+        if x0 <= x < x1 and y0 <= y < y1 and (x, y) != origin:
+            cost[x - x0, y - y0] = 0
+
+    graph = tcod.path.SimpleGraph(cost=cost, cardinal=2, diagonal=3)
+    pathfinder = tcod.path.Pathfinder(graph)
+    pathfinder.add_root((ox - x0, oy - y0))
+
+    detour = pathfinder.path_to((rx - x0, ry - y0))
+
+    # an unreachable destination comes back without our start point on it.
+    if len(detour) < 2 or tuple(detour[0]) != (ox - x0, oy - y0):
+        return False
+
+    path.splice(rejoin + 1, detour[1:] + (x0, y0))
+    return True
+
+
+def octile_cost(a: Tuple[int, int], b: Tuple[int, int]) -> int:
+    """The cost of walking from a to b on open floor (cardinal=2, diagonal=3.)"""
+    dx, dy = abs(a[0] - b[0]), abs(a[1] - b[1])
+    return 2 * max(dx, dy) + min(dx, dy)
+
+
+def find_path_in_box(
+    walkable: np.ndarray,
+    start: Tuple[int, int],
+    goal: Tuple[int, int],
+    margin: int = 4,
+    blocked: Optional[np.ndarray] = None,
+) -> Optional[np.ndarray]:
+    """Path from start to goal (both ends included) searching as small a box as we can.
+
+    Starts with a box just around the two points, and doubles the margin until
+    a path turns up or the box covers the whole map. Returns None if the goal
+    can't be reached at all. `blocked` is an (n, 2) array of points that cost
+    BLOCKED_COST extra to go through.
+    """
+    width, height = walkable.shape
+
+    while True:
+        x0 = max(0, min(start[0], goal[0]) - margin)
+        y0 = max(0, min(start[1], goal[1]) - margin)
+        x1 = min(width, max(start[0], goal[0]) + margin + 1)
+        y1 = min(height, max(start[1], goal[1]) + margin + 1)
+
+        cost = np.array(walkable[x0:x1, y0:y1], dtype=np.int8)
+        if blocked is not None and len(blocked):
+            inside = blocked[((blocked >= (x0, y0)) & (blocked < (x1, y1))).all(axis=1)]
+            bx, by = (inside - (x0, y0)).T
+            cost[bx, by] += BLOCKED_COST * (cost[bx, by] != 0)
+
+        graph = tcod.path.SimpleGraph(cost=cost, cardinal=2, diagonal=3)
+        pathfinder = tcod.path.Pathfinder(graph)
+        pathfinder.add_root((start[0] - x0, start[1] - y0))
+
+        path = pathfinder.path_to((goal[0] - x0, goal[1] - y0))
+        if tuple(path[0]) == (start[0] - x0, start[1] - y0):
+            return path + (x0, y0)
+
+        if x0 == 0 and y0 == 0 and x1 == width and y1 == height:
+            return None
+
+        margin *= 2
+
+
+class RoomGraph:
+    """The rooms procgen carved out, and the doors that lead in and out of them.
+
+    This is what long routes get planned over: first hop from door to door
+    across the graph, then fill in each hop with a search in a box that's only
+    as big as that hop. Rooms are open floor inside, so going between two doors
+    of the same room is cheap and certain. Going between rooms through the
+    outside is estimated from distance, and the search for that hop sorts out
+    the details.
+    """
+
+    def __init__(self, rooms: Sequence, walkable: np.ndarray):
+        self.rooms = list(rooms)
+
+        # which room (walls included) each tile belongs to, -1 for outside.
+        self.room_at = np.full(walkable.shape, -1, dtype=np.int16, order="F")
+
+        self.doors: List[Tuple[int, int]] = []
+        self.door_rooms: List[int] = []
+
+        for index, room in enumerate(self.rooms):
+            self.room_at[room.outer] = index
+
+            # a door is any gap in the room's wall.
+            ring = np.array(walkable[room.outer])
+            ring[1:-1, 1:-1] = False
+
+            ox, oy = room.outer[0].start, room.outer[1].start
+            seen: List[Tuple[int, int]] = []
+            for x, y in zip(*np.nonzero(ring)):
+                door = (int(x) + ox, int(y) + oy)
+
+                # a tunnel running along a wall opens up a whole run of it.
+                # one door per run is plenty for planning.
+                if not any(max(abs(door[0] - sx), abs(door[1] - sy)) <= 1 for sx, sy in seen):
+                    self.doors.append(door)
+                    self.door_rooms.append(index)
+                seen.append(door)
+
+    def in_doorway(self, point: Tuple[int, int]) -> bool:
+        """True if this point is in a room's wall (so it must be a gap in it.)"""
+        index = self.room_at[point]
+        if index < 0:
+            return False
+
+        room = self.rooms[index]
+        return not (room.x1 < point[0] < room.x2 and room.y1 < point[1] < room.y2)
+
+    def plan(self, start: Tuple[int, int], goal: Tuple[int, int]) -> List[Tuple[int, int]]:
+        """Return the points to pass through on the way, start and goal included.
+
+        This is A* over the doors, with every step costed as if it were open
+        floor. Each step is worked out for every door at once.
+        """
+        # node 0 is the start, node 1 the goal, and the rest are doors.
+        points = np.array([start, goal] + self.doors, dtype=np.int32).reshape(-1, 2)
+        rooms = np.array(
+            [self.room_at[start], self.room_at[goal]] + self.door_rooms, dtype=np.int16
+        )
+
+        # you can only get between rooms by going outside, which means leaving
+        # through a door (or not being in a room in the first place.)
+        can_leave = rooms == -1
+        can_leave[2:] = True
+        can_leave[0] |= self.in_doorway(start)
+        can_leave[1] |= self.in_doorway(goal)
+
+        def costs_from(node: int) -> np.ndarray:
+            delta = np.abs(points - points[node])
+            return 2 * delta.max(axis=1) + delta.min(axis=1)
+
+        to_goal = costs_from(1)
+
+        distances = np.full(len(points), np.iinfo(np.int32).max, dtype=np.int64)
+        distances[0] = 0
+        previous = np.full(len(points), -1, dtype=np.int32)
+        done = np.zeros(len(points), dtype=bool)
+
+        while True:
+            estimates = np.where(done, np.iinfo(np.int64).max, distances + to_goal)
+            node = int(estimates.argmin())
+            if done[node] or distances[node] == np.iinfo(np.int32).max:
+                break  # nothing left we can get to.
+            if node == 1:
+                break
+            done[node] = True
+
+            reachable = ~done & ((rooms == rooms[node]) | (can_leave & can_leave[node]))
+            new_distances = distances[node] + costs_from(node)
+
+            better = reachable & (new_distances < distances)
+            distances[better] = new_distances[better]
+            previous[better] = node
+
+        if previous[1] < 0:
+            return [start, goal]  # nothing better to go on. let the search sort it out.
+
+        route = [goal]
+        node = 1
+        while node != 0:
+            node = int(previous[node])
+            route.append(tuple(int(n) for n in points[node]))
+
+        return route[::-1]
+
+    def stepping_stones(
+        self, walkable: np.ndarray, a: Tuple[int, int], b: Tuple[int, int],
+    ) -> List[Tuple[int, int]]:
+        """Break a long trip across the outside into hops of about LEG_LENGTH.
+
+        Each stop is the open tile outside any room nearest to the straight
+        line between a and b. Searching a few small boxes touches far fewer
+        tiles than searching one box big enough to hold the whole trip.
+        """
+        steps = max(abs(a[0] - b[0]), abs(a[1] - b[1])) // LEG_LENGTH
+        stones = []
+        radius = LEG_LENGTH // 2
+
+        for i in range(1, steps + 1):
+            x = a[0] + (b[0] - a[0]) * i // (steps + 1)
+            y = a[1] + (b[1] - a[1]) * i // (steps + 1)
+
+            x0, y0 = max(0, x - radius), max(0, y - radius)
+            x1 = min(walkable.shape[0], x + radius + 1)
+            y1 = min(walkable.shape[1], y + radius + 1)
+
+            open_ground = walkable[x0:x1, y0:y1] & (self.room_at[x0:x1, y0:y1] == -1)
+            xs, ys = np.nonzero(open_ground)
+            if len(xs) == 0:
+                continue  # all room here. skip it and make the hop longer.
+
+            nearest = (np.maximum(np.abs(xs + x0 - x), np.abs(ys + y0 - y))).argmin()
+            stones.append((int(xs[nearest]) + x0, int(ys[nearest]) + y0))
+
+        return stones
+
+    def find_path(
+        self,
+        walkable: np.ndarray,
+        start: Tuple[int, int],
+        goal: Tuple[int, int],
+        blocked: Iterable[Tuple[int, int]] = (),
+    ) -> Optional[np.ndarray]:
+        """Path from start to goal with the start left off, or None if there isn't one.
+
+        Tiles in `blocked` cost extra to go through, like in BaseAI.get_path_to.
+        """
+        route = self.plan(start, goal)
+        blocked = np.array(list(blocked), dtype=np.int32).reshape(-1, 2)
+
+        points = [route[0]]
+        for a, b in zip(route, route[1:]):
+            if self.room_at[a] != self.room_at[b] or self.room_at[a] == -1:
+                # this hop is across the outside.
+                points.extend(self.stepping_stones(walkable, a, b))
+            points.append(b)
+
+        legs = [np.empty((0, 2), dtype=np.int32)]
+        for a, b in zip(points, points[1:]):
+            leg = find_path_in_box(walkable, a, b, blocked=blocked)
+            if leg is None:
+                return None
+            legs.append(leg[1:])
+
+        return np.concatenate(legs)
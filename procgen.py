@@ -1,12 +1,17 @@
 from __future__ import annotations
 
+from concurrent.futures import ProcessPoolExecutor
+import multiprocessing
+import os
 import random
-from typing import Iterator, List, Tuple, TYPE_CHECKING
+from typing import Iterator, List, NamedTuple, Optional, Set, Tuple, TYPE_CHECKING
 
+import numpy as np  # type: ignore
 import tcod
 
 import entity_factories
 from game_map import GameMap
+from pathfinding import RoomGraph
 import tile_types
 
 
@@ -47,29 +52,46 @@ class RectangularRoom:
         )
 
 
-def place_entities(
-    room: RectangularRoom, dungeon: GameMap, maximum_monsters: int,
-) -> None:
-    number_of_monsters = random.randint(0, maximum_monsters)
+def roll_monsters(
+    room: RectangularRoom, maximum_monsters: int, taken: Set[Tuple[int, int]], rng=random,
+) -> List[Tuple[str, int, int]]:
+    """Pick the monsters for a room, as (monster name, x, y).
+
+    Spots in `taken` are skipped, and the ones picked get added to it. `rng` is
+    anything with random's methods, the random module itself by default.
+    """
+    monsters = []
+    number_of_monsters = rng.randint(0, maximum_monsters)
 
     for i in range(number_of_monsters):
-        x = random.randint(room.x1 + 1, room.x2 - 1)
-        y = random.randint(room.y1 + 1, room.y2 - 1)
+        x = rng.randint(room.x1 + 1, room.x2 - 1)
+        y = rng.randint(room.y1 + 1, room.y2 - 1)
 
-        if not any(entity.x == x and entity.y == y for entity in dungeon.entities):
-            if random.random() < 0.8:
-                entity_factories.orc.spawn(dungeon, x, y)
+        if (x, y) not in taken:
+            if rng.random() < 0.8:
+                monsters.append((entity_factories.orc.name, x, y))
             else:
-                entity_factories.troll.spawn(dungeon, x, y)
+                monsters.append((entity_factories.troll.name, x, y))
+            taken.add((x, y))
+
+    return monsters
+
+
+def place_entities(
+    room: RectangularRoom, dungeon: GameMap, maximum_monsters: int,
+) -> None:
+    taken = {(entity.x, entity.y) for entity in dungeon.entities}
+    for name, x, y in roll_monsters(room, maximum_monsters, taken):
+        entity_factories.monsters[name].spawn(dungeon, x, y)
 
 
 def tunnel_between(
-    start: Tuple[int, int], end: Tuple[int, int]
+    start: Tuple[int, int], end: Tuple[int, int], rng=random
 ) -> Iterator[Tuple[int, int]]:
     """Return an L-shaped tunnel between these two points."""
     x1, y1 = start
     x2, y2 = end
-    if random.random() < 0.5:  # 50% chance.
+    if rng.random() < 0.5:  # 50% chance.
         # Move horizontally, then vertically.
         corner_x, corner_y = x2, y1
     else:
@@ -98,7 +120,7 @@ def generate_dungeon(
 
     rooms: List[RectangularRoom] = []
 
-    dungeon.tiles[:] = tile_types.floor
+    dungeon.set_tiles((slice(None), slice(None)), tile_types.floor)
 
     #
 
@@ -118,8 +140,8 @@ def generate_dungeon(
         # If there are no intersections then the room is valid.
 
         # Dig out this rooms inner area.
-        dungeon.tiles[new_room.outer] = tile_types.wall
-        dungeon.tiles[new_room.inner] = tile_types.floor
+        dungeon.set_tiles(new_room.outer, tile_types.wall)
+        dungeon.set_tiles(new_room.inner, tile_types.floor)
 
         if len(rooms) == 0:
             # The first room, where the player starts.
@@ -129,7 +151,7 @@ def generate_dungeon(
             # in this new generation model this is sort of a hack -- it creates
             # doors but does nothing else.
             for x, y in tunnel_between(rooms[-1].center, new_room.center):
-                dungeon.tiles[x, y] = tile_types.floor
+                dungeon.set_tiles((x, y), tile_types.floor)
 
         place_entities(new_room, dungeon, max_monsters_per_room)
 
@@ -141,4 +163,208 @@ def generate_dungeon(
     # and I can trust it at this point in execution???
     # dungeon.entities = set(list(dungeon.entities)[0:2])
 
+    # hang on to the layout so long routes can be planned room by room.
+    dungeon.room_graph = RoomGraph(rooms, dungeon.walkable)
+
     return dungeon
+
+
+# chunked generation splits the map into regions about this big on a side.
+REGION_SIZE = 128
+# carving is cheap (about 20ns a tile) next to starting a worker process
+# (a few hundred ms), so smaller maps than this get carved right here.
+PARALLEL_MIN_AREA = 20_000_000
+
+
+class RegionPlan(NamedTuple):
+    """What one region of a chunked dungeon came out as. Map coordinates throughout."""
+
+    bounds: Tuple[int, int, int, int]  # x1, y1, x2, y2, exclusive.
+    tiles: np.ndarray  # just this region's tiles.
+    rooms: List[RectangularRoom]
+    monsters: List[Tuple[str, int, int]]
+
+
+def carve_region(
+    bounds: Tuple[int, int, int, int],
+    attempts: int,
+    room_min_size: int,
+    room_max_size: int,
+    max_monsters_per_room: int,
+    seed: int,
+    player_room: bool,
+) -> RegionPlan:
+    """Lay out one region, with its own random stream. This is what runs in the workers.
+
+    The same thing generate_dungeon does for the whole map, but rooms stay
+    inside `bounds`. If `player_room`, the middle of the first room is left
+    free for the player.
+    """
+    rng = random.Random(seed)
+    x1, y1, x2, y2 = bounds
+
+    tiles = np.full((x2 - x1, y2 - y1), tile_types.floor, dtype=np.uint8, order="F")
+    rooms: List[RectangularRoom] = []
+    links: List[Tuple[int, int]] = []
+    monsters: List[Tuple[str, int, int]] = []
+    taken: Set[Tuple[int, int]] = set()
+
+    for r in range(attempts):
+        room_width = rng.randint(room_min_size, room_max_size)
+        room_height = rng.randint(room_min_size, room_max_size)
+
+        x = rng.randint(x1, x2 - room_width - 1)
+        y = rng.randint(y1, y2 - room_height - 1)
+        new_room = RectangularRoom(x, y, room_width, room_height)
+
+        if any(new_room.intersects(other_room) for other_room in rooms):
+            continue
+
+        outer_x, outer_y = new_room.outer
+        inner_x, inner_y = new_room.inner
+        tiles[outer_x.start - x1:outer_x.stop - x1, outer_y.start - y1:outer_y.stop - y1] = (
+            tile_types.wall
+        )
+        tiles[inner_x.start - x1:inner_x.stop - x1, inner_y.start - y1:inner_y.stop - y1] = (
+            tile_types.floor
+        )
+
+        if rooms:
+            links.append((len(rooms) - 1, len(rooms)))
+        elif player_room:
+            taken.add(new_room.center)
+
+        monsters += roll_monsters(new_room, max_monsters_per_room, taken, rng)
+        rooms.append(new_room)
+
+    # tunnels go in once every room has, so a room built right up against
+    # another can't wall over the doorway a tunnel made, and seal it in.
+    for a, b in links:
+        for tx, ty in tunnel_between(rooms[a].center, rooms[b].center, rng):
+            tiles[tx - x1, ty - y1] = tile_types.floor
+
+    return RegionPlan(bounds, tiles, rooms, monsters)
+
+
+def split_map(
+    map_width: int, map_height: int, room_max_size: int, region_size: int = REGION_SIZE
+) -> List[Tuple[int, int, int, int]]:
+    """Cut the map into a grid of regions, row by row. Every region fits the biggest room."""
+    smallest = room_max_size + 2
+    columns = max(1, min(round(map_width / region_size), map_width // smallest))
+    rows = max(1, min(round(map_height / region_size), map_height // smallest))
+
+    xs = [map_width * i // columns for i in range(columns + 1)]
+    ys = [map_height * i // rows for i in range(rows + 1)]
+    return [
+        (xs[column], ys[row], xs[column + 1], ys[row + 1])
+        for row in range(rows)
+        for column in range(columns)
+    ]
+
+
+def generate_dungeon_chunked(
+    max_rooms: int,
+    room_min_size: int,
+    room_max_size: int,
+    map_width: int,
+    map_height: int,
+    max_monsters_per_room: int,
+    engine: Engine,
+    seed: Optional[int] = None,
+    workers: Optional[int] = None,
+    region_size: int = REGION_SIZE,
+) -> GameMap:
+    """generate_dungeon for big maps: regions get laid out in parallel, then joined up.
+
+    Each region gets its share of `max_rooms` and its own random stream, split
+    off `seed`. Neighbouring regions are then joined by a tunnel between their
+    closest rooms. The same seed gives the same dungeon however many `workers`
+    there are. With no seed, one is drawn from `random`, so seeding that still
+    works.
+    """
+    if seed is None:
+        seed = random.getrandbits(64)
+
+    regions = split_map(map_width, map_height, room_max_size, region_size)
+    streams = np.random.SeedSequence(seed).spawn(len(regions) + 1)
+    area = map_width * map_height
+
+    jobs = [
+        (
+            bounds,
+            max(1, round(max_rooms * (bounds[2] - bounds[0]) * (bounds[3] - bounds[1]) / area)),
+            room_min_size,
+            room_max_size,
+            max_monsters_per_room,
+            int(stream.generate_state(1)[0]),
+            index == 0,
+        )
+        for index, (bounds, stream) in enumerate(zip(regions, streams))
+    ]
+
+    if workers is None:
+        workers = (os.cpu_count() or 1) if area >= PARALLEL_MIN_AREA else 1
+    workers = min(workers, len(jobs))
+
+    if workers <= 1:
+        plans = [carve_region(*job) for job in jobs]
+    else:
+        # spawn, for the same reason as the level streamer: the window might
+        # already be open.
+        with ProcessPoolExecutor(
+            max_workers=workers, mp_context=multiprocessing.get_context("spawn")
+        ) as pool:
+            # regions are small, so hand them out a batch at a time.
+            chunksize = max(1, len(jobs) // (workers * 4))
+            plans = list(pool.map(carve_region, *zip(*jobs), chunksize=chunksize))
+
+    player = engine.player
+    dungeon = GameMap(engine, map_width, map_height, entities=[player])
+
+    tiles = np.empty((map_width, map_height), dtype=np.uint8, order="F")
+    rooms: List[RectangularRoom] = []
+    # where each region's rooms start in rooms.
+    first_room: List[int] = []
+
+    for plan in plans:
+        x1, y1, x2, y2 = plan.bounds
+        tiles[x1:x2, y1:y2] = plan.tiles
+        first_room.append(len(rooms))
+        rooms += plan.rooms
+
+    # join every region to the ones right of and below it.
+    rng = random.Random(int(streams[-1].generate_state(1)[0]))
+    neighbours = {plan.bounds[:2]: index for index, plan in enumerate(plans)}
+    for index, plan in enumerate(plans):
+        x1, y1, x2, y2 = plan.bounds
+        for other in (neighbours.get((x2, y1)), neighbours.get((x1, y2))):
+            if other is None:
+                continue
+
+            a, b = min(
+                (
+                    (i, j)
+                    for i in range(first_room[index], first_room[index] + len(plan.rooms))
+                    for j in range(first_room[other], first_room[other] + len(plans[other].rooms))
+                ),
+                key=lambda pair: _distance(rooms[pair[0]].center, rooms[pair[1]].center),
+            )
+            for x, y in tunnel_between(rooms[a].center, rooms[b].center, rng):
+                tiles[x, y] = tile_types.floor
+
+    dungeon.tiles = tiles
+    dungeon.tile_changes.mark_all()
+
+    player.place(*rooms[0].center, dungeon)
+    for plan in plans:
+        for name, x, y in plan.monsters:
+            entity_factories.monsters[name].spawn(dungeon, x, y)
+
+    dungeon.room_graph = RoomGraph(rooms, dungeon.walkable)
+
+    return dungeon
+
+
+def _distance(a: Tuple[int, int], b: Tuple[int, int]) -> int:
+    return abs(a[0] - b[0]) + abs(a[1] - b[1])
@@ -0,0 +1,245 @@
+from __future__ import annotations
+
+from collections import deque
+from contextlib import contextmanager
+import os
+import sys
+import threading
+import time
+import tracemalloc
+from typing import Deque, Iterator, List, Optional, TextIO, Tuple, TYPE_CHECKING
+
+import color
+
+if TYPE_CHECKING:
+    import cProfile
+
+    from engine import Engine
+
+# how many turns a capture covers, unless it's stopped early.
+CAPTURE_TURNS = 50
+# where captures get written. they're regular pstats files, so python -m pstats,
+# snakeviz, flameprof etc. can all read them.
+CAPTURE_DIR = "profiles"
+
+# how many frames the HUD's frame time is averaged over.
+FRAME_WINDOW = 60
+# how often the HUD re-reads memory use, in seconds. it's not free, and it
+# doesn't need to be per frame.
+MEMORY_INTERVAL = 0.5
+
+
+class Profiler:
+    """cProfile the game for the next few turns, started from inside the game.
+
+    Captures are named after the state of the game when they started (map size,
+    enemy count, vision mode) and how many turns and frames they covered.
+
+    cProfile only sees the thread it was started on. When frames are drawn on
+    another thread (see game_loop), wrap the drawing in `drawing()` and they
+    get their own profile, which goes into the same file.
+    """
+
+    def __init__(self, engine: Engine, turns: int = CAPTURE_TURNS, directory: str = CAPTURE_DIR):
+        self.engine = engine
+        self.turns = turns
+        self.directory = directory
+
+        self.profile: Optional[cProfile.Profile] = None
+        # the thread the turns are played on, and the profile for frames
+        # drawn on any other one.
+        self.thread: Optional[int] = None
+        self.frame_profile: Optional[cProfile.Profile] = None
+        self.frames_profiled = False
+        self.tag = ""
+        self.turns_done = 0
+        self.frames_done = 0
+
+    @property
+    def running(self) -> bool:
+        return self.profile is not None
+
+    def toggle(self) -> None:
+        if self.running:
+            self.stop()
+        else:
+            self.start()
+
+    def start(self) -> None:
+        game_map = self.engine.game_map
+        vision = "vision" if game_map.vision_mode else "normal"
+        self.tag = (
+            f"{game_map.width}x{game_map.height}"
+            f"-{len(game_map.actors) - 1}enemies-{vision}"
+        )
+        self.turns_done = self.frames_done = 0
+
+        self.engine.message_log.add_message(
+            f"Profiling the next {self.turns} turns.", color.welcome_text
+        )
+
+        # only pay for importing it if we're actually profiling.
+        import cProfile
+
+        self.thread = threading.get_ident()
+        self.frame_profile = cProfile.Profile()
+        self.frames_profiled = False
+        self.profile = cProfile.Profile()
+        self.profile.enable()
+
+    def stop(self) -> str:
+        """Stop capturing and write it out. Returns where it went."""
+        import pstats
+
+        # frames are drawn under the engine lock, so this waits for the one
+        # being drawn to finish.
+        with self.engine.lock:
+            self.profile.disable()
+            stats = pstats.Stats(self.profile)
+            if self.frames_profiled:
+                stats.add(self.frame_profile)
+            self.profile = self.frame_profile = None
+
+        os.makedirs(self.directory, exist_ok=True)
+        path = os.path.join(
+            self.directory,
+            f"{time.strftime('%Y%m%d-%H%M%S')}-{self.tag}"
+            f"-{self.turns_done}turns-{self.frames_done}frames.prof",
+        )
+        stats.dump_stats(path)
+
+        self.engine.message_log.add_message(f"Profile saved to {path}.", color.welcome_text)
+        return path
+
+    def turn_done(self) -> None:
+        if not self.running:
+            return
+
+        self.turns_done += 1
+        if self.turns_done >= self.turns:
+            self.stop()
+
+    @contextmanager
+    def drawing(self) -> Iterator[None]:
+        """Profile a frame, if it's drawn on a thread the capture can't see."""
+        profile = self.frame_profile
+        if threading.get_ident() == self.thread:
+            profile = None  # the main capture already sees it.
+
+        if profile is not None:
+            try:
+                profile.enable()
+            except ValueError:
+                # newer pythons have one profiler for every thread, and it's
+                # already running.
+                profile = None
+
+        try:
+            yield
+        finally:
+            if profile is not None:
+                profile.disable()
+                self.frames_profiled = True
+
+    def frame_done(self) -> None:
+        if self.running:
+            self.frames_done += 1
+
+
+class PhaseTimer:
+    """Where the time goes in something that happens in steps, like startup.
+
+    Call `mark` at the end of each phase, and `report` at the end to print how
+    long each took. Does nothing unless it's enabled.
+    """
+
+    def __init__(self, enabled: bool, start: Optional[float] = None):
+        self.enabled = enabled
+        self.start = time.perf_counter() if start is None else start
+        self.last = self.start
+        self.phases: List[Tuple[str, float]] = []
+
+    def mark(self, name: str) -> None:
+        if not self.enabled:
+            return
+
+        now = time.perf_counter()
+        self.phases.append((name, now - self.last))
+        self.last = now
+
+    def report(self, stream: TextIO = sys.stderr) -> None:
+        if not self.enabled:
+            return
+
+        for name, seconds in self.phases:
+            print(f"{name:>24} {seconds * 1000:8.1f} ms", file=stream)
+        print(f"{'total':>24} {(self.last - self.start) * 1000:8.1f} ms", file=stream)
+
+
+class PerfStats:
+    """Running numbers for the performance HUD.
+
+    The timings are always kept, it's a couple of perf_counter calls a turn
+    and a frame. Memory is only looked at while the HUD is showing.
+    """
+
+    def __init__(self, window: int = FRAME_WINDOW):
+        self.visible = False
+
+        # seconds between the starts of the last few frames.
+        self.frame_times: Deque[float] = deque(maxlen=window)
+        self.last_frame: Optional[float] = None
+
+        # how long the last turn's enemy AI, FOV and frame render took.
+        self.ai = 0.0
+        self.fov = 0.0
+        self.render = 0.0
+
+        # bytes. rss is None where /proc isn't, traced is None unless
+        # tracemalloc is running.
+        self.rss: Optional[int] = None
+        self.traced: Optional[Tuple[int, int]] = None
+        self.memory_read = 0.0
+
+    def toggle(self) -> None:
+        self.visible = not self.visible
+        self.memory_read = 0.0
+
+    def toggle_tracemalloc(self) -> None:
+        """tracemalloc slows everything down a lot, so it's off until asked for."""
+        if tracemalloc.is_tracing():
+            tracemalloc.stop()
+        else:
+            tracemalloc.start()
+        self.memory_read = 0.0
+
+    def frame_started(self, now: float) -> None:
+        if self.last_frame is not None:
+            self.frame_times.append(now - self.last_frame)
+        self.last_frame = now
+
+    @property
+    def frame_average(self) -> float:
+        return sum(self.frame_times) / len(self.frame_times) if self.frame_times else 0.0
+
+    @property
+    def frame_worst(self) -> float:
+        return max(self.frame_times, default=0.0)
+
+    def read_memory(self, now: float) -> None:
+        if now - self.memory_read < MEMORY_INTERVAL:
+            return
+        self.memory_read = now
+
+        self.rss = rss()
+        self.traced = tracemalloc.get_traced_memory() if tracemalloc.is_tracing() else None
+
+
+def rss() -> Optional[int]:
+    """This process's resident set size in bytes, or None if it can't be had."""
+    try:
+        with open("/proc/self/statm") as statm:
+            pages = int(statm.read().split()[1])
+    except (OSError, ValueError, IndexError):
+        return None
+    return pages * os.sysconf("SC_PAGE_SIZE")
@@ -1,5 +1,6 @@
 from __future__ import annotations
 
+import time
 from typing import TYPE_CHECKING
 
 import color
@@ -15,7 +16,8 @@ def get_names_at_location(x: int, y: int, game_map: GameMap) -> str:
         return ""
 
     names = ", ".join(
-        entity.name for entity in game_map.entities if entity.x == x and entity.y == y
+        [entity.name for entity in game_map.entities if entity.x == x and entity.y == y]
+        + list(game_map.decal_names.get((x, y), ()))
     )
 
     return names.capitalize()
@@ -48,3 +50,33 @@ def render_names_at_mouse_location(
     )
 
     console.print(x=x, y=y, string=names_at_mouse_location)
+
+
+def render_perf_hud(console: Console, x: int, y: int, engine: Engine) -> None:
+    """The F3 overlay: frame and turn timings, what's on the map, and memory."""
+    perf = engine.perf
+    game_map = engine.game_map
+    perf.read_memory(time.perf_counter())
+
+    rss = f"{perf.rss / 2**20:.1f} MB" if perf.rss is not None else "n/a"
+    if perf.traced is not None:
+        current, peak = perf.traced
+        traced = f"{current / 2**20:.1f} MB (peak {peak / 2**20:.1f})"
+    else:
+        traced = "off (shift-F3)"
+
+    lines = [
+        f"frame  {perf.frame_average * 1000:5.1f} ms avg {perf.frame_worst * 1000:6.1f} max",
+        f"turn   ai {perf.ai * 1000:.2f}  fov {perf.fov * 1000:.2f} ms",
+        f"render {perf.render * 1000:5.2f} ms",
+        f"entities {len(game_map.entities)}  corpses "
+        f"{sum(len(names) for names in game_map.decal_names.values())}",
+        f"log    {len(engine.message_log.messages)} messages",
+        f"rss    {rss}",
+        f"traced {traced}",
+    ]
+    width = max(len(line) for line in lines) + 2
+
+    console.draw_rect(x=x, y=y, width=width, height=len(lines), ch=ord(" "), bg=color.hud_bg)
+    for i, line in enumerate(lines):
+        console.print(x=x + 1, y=y + i, string=line, fg=color.hud_text)
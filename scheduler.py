@@ -0,0 +1,125 @@
+from __future__ import annotations
+
+import heapq
+import time
+from typing import List, Optional, Tuple, TYPE_CHECKING
+
+if TYPE_CHECKING:
+    from engine import Engine
+    from entity import Actor
+    from game_map import GameMap
+
+
+class TurnScheduler:
+    """Decides which enemies act on a turn, and how much attention they get.
+
+    Every enemy sits in a priority queue keyed on the turn it next needs to
+    wake up. Enemies close enough to possibly see the player wake every turn
+    and get a full `perform()`. Enemies the player can see wake every turn
+    too, so they move smoothly on screen, but they only walk their patrol.
+    Everything else sleeps for a few turns and then catches up on its patrol
+    in one go. The cost of a turn then follows what is happening near the
+    player instead of the total number of enemies on the map.
+    """
+
+    def __init__(self, engine: Engine, near_radius: int = 24, max_sleep: int = 8):
+        self.engine = engine
+
+        # enemies within this (chebyshev) distance get full perception.
+        # it matches the radius enemies can see out to.
+        self.near_radius = near_radius
+        self.max_sleep = max_sleep
+
+        self.turn = 0
+        self.game_map: Optional[GameMap] = None
+
+        # (turn to wake on, tiebreak, actor, turn it last acted on)
+        self.queue: List[Tuple[int, int, Actor, int]] = []
+        self._counter = 0
+
+    def add(self, actor: Actor, wake_turn: Optional[int] = None) -> None:
+        """Schedule an actor. By default it acts on the next turn."""
+        if wake_turn is None:
+            wake_turn = self.turn + 1
+
+        self._push(actor, wake_turn, self.turn)
+
+    def _push(self, actor: Actor, wake_turn: int, last_turn: int) -> None:
+        self._counter += 1
+        heapq.heappush(self.queue, (wake_turn, self._counter, actor, last_turn))
+
+    def sync(self) -> None:
+        """Rebuild the queue if the engine has moved on to a different map."""
+        if self.game_map is self.engine.game_map:
+            return
+
+        self.game_map = self.engine.game_map
+        self.queue = []
+
+        for actor in self.game_map.actors:
+            if actor is not self.engine.player:
+                self.add(actor)
+
+    def distance_to_player(self, actor: Actor) -> int:
+        player = self.engine.player
+        return max(abs(actor.x - player.x), abs(actor.y - player.y))
+
+    def sleep_for(self, actor: Actor) -> int:
+        """How many turns this actor can safely skip before acting again."""
+        distance = self.distance_to_player(actor)
+
+        if distance <= self.near_radius or self.game_map.visible[actor.x, actor.y]:
+            return 1
+
+        # the gap closes by at most two tiles a turn (we walk, they walk), so
+        # wake up before the player could possibly be in range.
+        return max(1, min(self.max_sleep, (distance - self.near_radius) // 2))
+
+    def run_turn(self) -> None:
+        """Give every actor that's due this turn its turn."""
+        self.sync()
+        self.turn += 1
+        self.wake_visible()
+
+        while self.queue and self.queue[0][0] <= self.turn:
+            # the lock is let go between actors, so a frame can be drawn
+            # part way through a long turn.
+            with self.engine.lock:
+                self._run_actor()
+            if self.engine.drawn_concurrently and not self.engine.fast_forwarding:
+                # otherwise we'd usually grab the lock straight back, before
+                # a frame that's waiting on it ever gets a look in.
+                time.sleep(0)
+
+    def wake_visible(self) -> None:
+        """Bring forward anyone asleep that the player can now see.
+
+        Rounding a corner can bring a sleeper into view from much further off
+        than `near_radius`. Left alone, it would stand still on screen and
+        then jump to catch up when it woke.
+        """
+        visible = self.game_map.visible
+        woken = False
+        for i, (wake_turn, counter, actor, last_turn) in enumerate(self.queue):
+            if wake_turn > self.turn and visible[actor.x, actor.y]:
+                self.queue[i] = (self.turn, counter, actor, last_turn)
+                woken = True
+
+        if woken:
+            heapq.heapify(self.queue)
+
+    def _run_actor(self) -> None:
+        _, _, actor, last_turn = heapq.heappop(self.queue)
+
+        # dead, or moved to another map. either way, drop it.
+        if not actor.ai or actor.gamemap is not self.game_map:
+            return
+
+        if self.distance_to_player(actor) <= self.near_radius:
+            actor.ai.perform()
+        else:
+            actor.ai.advance(self.turn - last_turn)
+
+        # it could have died during its own turn.
+        if actor.ai:
+            self._push(actor, self.turn + self.sleep_for(actor), self.turn)
@@ -0,0 +1,153 @@
+from __future__ import annotations
+
+import random
+from typing import Any, List, NamedTuple, Optional, Tuple, TYPE_CHECKING
+
+import numpy as np  # type: ignore
+
+from entity import Actor
+from pathfinding import Path
+
+if TYPE_CHECKING:
+    from components.ai import BaseAI
+    from engine import Engine
+    from entity import Entity
+    from geometry import Facing
+    from game_map import GameMap
+    from input_handlers import EventHandler
+    from render_order import RenderOrder
+
+
+class EntityRecord(NamedTuple):
+    """The parts of an entity that change during play."""
+
+    entity: Entity
+    x: int
+    y: int
+    facing: Facing
+    char: str
+    color: Tuple[int, int, int]
+    name: str
+    blocks_movement: bool
+    render_order: RenderOrder
+
+    # actors only.
+    hp: Optional[int] = None
+    ai: Optional[BaseAI] = None
+    target_lock: Optional[Actor] = None
+    # HostileEnemy only. path points are never written to, so keeping them
+    # is free.
+    mode: Any = None
+    waypoint: Optional[Tuple[int, int]] = None
+    path: Optional[Tuple[np.ndarray, int]] = None
+
+    @classmethod
+    def capture(cls, entity: Entity) -> EntityRecord:
+        record = (
+            entity,
+            entity.x,
+            entity.y,
+            entity.facing,
+            entity.char,
+            entity.color,
+            entity.name,
+            entity.blocks_movement,
+            entity.render_order,
+        )
+        if not isinstance(entity, Actor):
+            return cls(*record)
+
+        ai = entity.ai
+        path = getattr(ai, "path", None)
+        return cls(
+            *record,
+            hp=entity.fighter.hp,
+            ai=ai,
+            target_lock=entity.target_lock,
+            mode=getattr(ai, "mode", None),
+            waypoint=getattr(ai, "waypoint", None),
+            path=None if path is None else (path.points, path.cursor),
+        )
+
+    def restore(self, game_map: GameMap) -> None:
+        entity = self.entity
+        entity.gamemap = game_map
+        entity.x, entity.y = self.x, self.y
+        entity.facing = self.facing
+        entity.char = self.char
+        entity.color = self.color
+        entity.name = self.name
+        entity.blocks_movement = self.blocks_movement
+        entity.render_order = self.render_order
+
+        if not isinstance(entity, Actor):
+            return
+
+        # straight to _hp. going through the setter can kill it.
+        entity.fighter._hp = self.hp
+        entity.ai = self.ai
+        entity.target_lock = self.target_lock
+
+        if self.path is not None:
+            path = Path()
+            path.points, path.cursor = self.path
+            self.ai.path = path
+            self.ai.mode = self.mode
+            self.ai.waypoint = self.waypoint
+
+
+class Snapshot:
+    """Everything about a game that changes from turn to turn.
+
+    Map layers are shared with the map copy-on-write, and entities are kept as
+    records, so taking one costs about as much as there are entities, not
+    as much as the map is big. Cheap enough to take every turn.
+
+    It doesn't cover the level streamer, so don't descend and then expect to
+    rewind into a level that hasn't been generated yet.
+    """
+
+    def __init__(self, engine: Engine):
+        game_map = engine.game_map
+
+        self.game_map = game_map
+        self.layers = game_map.share_layers()
+        self.entities: List[EntityRecord] = [
+            EntityRecord.capture(entity) for entity in game_map.entities
+        ]
+
+        messages = engine.message_log.messages
+        self.message_count = len(messages)
+        self.last_message_stack = messages[-1].count if messages else 0
+
+        scheduler = engine.scheduler
+        self.scheduler: Tuple[Any, ...] = (
+            scheduler.turn, list(scheduler.queue), scheduler._counter, scheduler.game_map
+        )
+
+        self.event_handler: EventHandler = engine.event_handler
+        self.random_state = random.getstate()
+
+    def restore(self, engine: Engine) -> None:
+        game_map = self.game_map
+        engine.game_map = game_map
+
+        game_map.restore_layers(self.layers)
+        for record in self.entities:
+            record.restore(game_map)
+        game_map.replace_entities(record.entity for record in self.entities)
+
+        messages = engine.message_log.messages
+        del messages[self.message_count:]
+        if messages:
+            messages[-1].count = self.last_message_stack
+
+        scheduler = engine.scheduler
+        turn, queue, counter, scheduler.game_map = self.scheduler
+        scheduler.turn, scheduler.queue, scheduler._counter = turn, list(queue), counter
+
+        engine.event_handler = self.event_handler
+        random.setstate(self.random_state)
+
+        # the FOV is in the layers, but let the engine check it again.
+        engine._fov_key = None
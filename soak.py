@@ -0,0 +1,193 @@
+#!/usr/bin/env python3
+"""Play lots of headless games at once and report how fast turns go.
+
+Each game gets its own seed and runs in its own process, with a bot player
+wandering around bumping into things. For example:
+
+    python soak.py --sizes 160x86 600x400 --monsters 1 3 --games 8 --turns 500
+"""
+from __future__ import annotations
+
+import argparse
+import copy
+import json
+import multiprocessing
+import os
+import random
+import resource
+import time
+import traceback
+import warnings
+from typing import Any, Dict, List, Tuple
+
+import numpy as np  # type: ignore
+
+# a game is (width, height, max monsters per room).
+Config = Tuple[int, int, int]
+
+DIRECTIONS = [(-1, -1), (0, -1), (1, -1), (-1, 0), (1, 0), (-1, 1), (0, 1), (1, 1)]
+
+
+def play(config: Config, seed: int, turns: int, render: bool, chunked: bool) -> Dict[str, Any]:
+    """Play one game for up to `turns` turns. This is what runs in the workers."""
+    # every worker would print tcod's deprecation warnings over the report.
+    warnings.simplefilter("ignore", DeprecationWarning)
+    warnings.simplefilter("ignore", FutureWarning)
+
+    import tcod
+
+    from actions import BumpAction, WaitAction
+    from engine import Engine
+    import entity_factories
+    from procgen import generate_dungeon, generate_dungeon_chunked
+
+    width, height, monsters = config
+    result: Dict[str, Any] = dict(config=config, seed=seed, turns=0, latencies=[], error=None)
+
+    try:
+        random.seed(seed)
+
+        player = copy.deepcopy(entity_factories.player)
+        player.is_player = True
+        engine = Engine(player=player, symmetric_fov=True)
+
+        # same room sizes as main, with more rooms on bigger maps.
+        params: Dict[str, Any] = dict(
+            max_rooms=max(10, width * height // 1400),
+            room_min_size=15,
+            room_max_size=30,
+            map_width=width,
+            map_height=height,
+            max_monsters_per_room=monsters,
+            engine=engine,
+        )
+        if chunked:
+            # pool workers can't start processes of their own, and the games
+            # are already spread over the cores anyway.
+            engine.game_map = generate_dungeon_chunked(**params, workers=1)
+        else:
+            engine.game_map = generate_dungeon(**params)
+        engine.update_fov()
+        result["enemies"] = len(engine.game_map.actors) - 1
+
+        console = tcod.Console(160, 100, order="F") if render else None
+
+        # walk in a straight line until we bump into something, then turn.
+        direction = random.choice(DIRECTIONS)
+        latencies = result["latencies"]
+
+        for _ in range(turns):
+            if not player.is_alive:
+                break
+
+            start = time.perf_counter()
+
+            # through play_turn like a real turn, so the snapshot it takes
+            # for rewinding gets counted too.
+            if random.random() < 0.1:
+                engine.play_turn(WaitAction(player))
+            else:
+                before = player.x, player.y
+                engine.play_turn(BumpAction(player, *direction))
+                if (player.x, player.y) == before:
+                    direction = random.choice(DIRECTIONS)
+
+            if console is not None:
+                console.clear()
+                engine.render(console)
+
+            latencies.append(time.perf_counter() - start)
+    except Exception:
+        result["error"] = traceback.format_exc(limit=-3)
+
+    result["turns"] = len(result["latencies"])
+    # ru_maxrss is in kilobytes on linux. each game gets a fresh process, so
+    # this is the peak for just this game.
+    result["peak_rss_mb"] = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+    return result
+
+
+def summarize(results: List[Dict[str, Any]]) -> Dict[str, Any]:
+    latencies = np.array([t for r in results for t in r["latencies"]])
+    total = latencies.sum()
+
+    return dict(
+        games=len(results),
+        crashes=sum(r["error"] is not None for r in results),
+        enemies=float(np.mean([r.get("enemies", 0) for r in results])),
+        turns=len(latencies),
+        turns_per_sec=len(latencies) / total if total else 0.0,
+        p50_ms=float(np.percentile(latencies, 50) * 1000) if len(latencies) else 0.0,
+        p99_ms=float(np.percentile(latencies, 99) * 1000) if len(latencies) else 0.0,
+        peak_rss_mb=max(r["peak_rss_mb"] for r in results),
+    )
+
+
+def parse_size(text: str) -> Tuple[int, int]:
+    width, height = text.lower().split("x")
+    return int(width), int(height)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--sizes", nargs="+", type=parse_size, default=[(160, 86)],
+                        help="map sizes to try, as WIDTHxHEIGHT")
+    parser.add_argument("--monsters", nargs="+", type=int, default=[1],
+                        help="max monsters per room settings to try")
+    parser.add_argument("--games", type=int, default=4, help="games per configuration")
+    parser.add_argument("--turns", type=int, default=500, help="turns per game")
+    parser.add_argument("--seed", type=int, default=0, help="seed of the first game")
+    parser.add_argument("--workers", type=int, default=os.cpu_count())
+    parser.add_argument("--render", action="store_true",
+                        help="render every turn to an offscreen console too")
+    parser.add_argument("--chunked", action="store_true",
+                        help="generate maps region by region, see generate_dungeon_chunked")
+    parser.add_argument("--json", metavar="FILE", help="also write the report here")
+    parser.add_argument("--show-errors", action="store_true",
+                        help="print the traceback of every crash")
+    args = parser.parse_args()
+
+    jobs = [
+        ((width, height, monsters), args.seed + game, args.turns, args.render, args.chunked)
+        for width, height in args.sizes
+        for monsters in args.monsters
+        for game in range(args.games)
+    ]
+
+    # a fresh process per game, so peak RSS means something.
+    with multiprocessing.Pool(args.workers, maxtasksperchild=1) as pool:
+        results = pool.starmap(play, jobs)
+
+    by_config: Dict[Config, List[Dict[str, Any]]] = {}
+    for result in results:
+        by_config.setdefault(tuple(result["config"]), []).append(result)
+
+    report = []
+    print(
+        f"{'map':>9} {'mon':>3} {'enemies':>7} {'games':>5} {'crash':>5} {'turns':>6}"
+        f" {'turns/s':>8} {'p50 ms':>7} {'p99 ms':>7} {'rss MB':>7}"
+    )
+    for (width, height, monsters), config_results in by_config.items():
+        summary = summarize(config_results)
+        report.append(dict(width=width, height=height, monsters=monsters, **summary))
+        print(
+            f"{f'{width}x{height}':>9} {monsters:>3} {summary['enemies']:>7.1f}"
+            f" {summary['games']:>5} {summary['crashes']:>5} {summary['turns']:>6}"
+            f" {summary['turns_per_sec']:>8.1f} {summary['p50_ms']:>7.2f}"
+            f" {summary['p99_ms']:>7.2f} {summary['peak_rss_mb']:>7.1f}"
+        )
+
+    crashed = [r for r in results if r["error"] is not None]
+    if crashed and args.show_errors:
+        for result in crashed:
+            print(f"\n{result['config']} seed {result['seed']}:\n{result['error']}")
+    elif crashed:
+        print(f"\n{len(crashed)} crashed, run with --show-errors for tracebacks.")
+
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump(report, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,55 @@
+from __future__ import annotations
+
+import copy
+import random
+
+import pytest
+
+from engine import Engine
+import entity_factories
+from game_map import GameMap
+from procgen import generate_dungeon
+import tile_types
+
+
+@pytest.fixture
+def engine() -> Engine:
+    player = copy.deepcopy(entity_factories.player)
+    player.is_player = True
+    return Engine(player=player, symmetric_fov=True)
+
+
+@pytest.fixture
+def open_map(engine):
+    """Make an all-floor map of the given size, with the player at 0, 0."""
+
+    def make(width: int, height: int) -> GameMap:
+        game_map = GameMap(engine, width, height, entities=[engine.player])
+        game_map.set_tiles((slice(None), slice(None)), tile_types.floor)
+        engine.player.place(0, 0, game_map)
+        engine.game_map = game_map
+        return game_map
+
+    return make
+
+
+@pytest.fixture
+def dungeon(engine):
+    """Generate a dungeon the way main.py does, from a fixed seed."""
+
+    def make(width: int = 160, height: int = 86, seed: int = 1, monsters: int = 1) -> GameMap:
+        random.seed(seed)
+        game_map = generate_dungeon(
+            max_rooms=max(10, width * height // 1300),
+            room_min_size=15,
+            room_max_size=30,
+            map_width=width,
+            map_height=height,
+            max_monsters_per_room=monsters,
+            engine=engine,
+        )
+        engine.game_map = game_map
+        engine.update_fov()
+        return game_map
+
+    return make
@@ -0,0 +1,72 @@
+from __future__ import annotations
+
+import numpy as np  # type: ignore
+import pytest
+
+from bitgrid import BitGrid
+
+
+def reference_words(cells: np.ndarray) -> np.ndarray:
+    """Cell x, y is bit y % 8 (least significant first) of byte y // 8 of column x."""
+    width, height = cells.shape
+    words = np.zeros((width, (height + 7) // 8), dtype=np.uint8)
+    for x in range(width):
+        for y in range(height):
+            if cells[x, y]:
+                words[x, y // 8] |= 1 << (y % 8)
+    return words
+
+
+def random_cells(width: int, height: int, seed: int = 0) -> np.ndarray:
+    return np.random.default_rng(seed).random((width, height)) < 0.4
+
+
+@pytest.mark.parametrize("height", [1, 7, 8, 9, 17, 86])
+def test_packs_along_y_low_bit_first(height):
+    cells = random_cells(5, height)
+    grid = BitGrid.pack(cells)
+
+    assert grid.shape == (5, height)
+    assert (grid.words == reference_words(cells)).all()
+    assert all(grid[x, y] == cells[x, y] for x in range(5) for y in range(height))
+
+
+@pytest.mark.parametrize("height", [1, 7, 8, 9, 86])
+def test_unpacks_any_window(height):
+    cells = random_cells(6, height, seed=1)
+    grid = BitGrid.pack(cells)
+
+    assert (grid.unpack() == cells).all()
+    for y1 in range(height):
+        for y2 in range(y1, height + 1):
+            window = grid.unpack(1, y1, 4, y2)
+            assert window.dtype == bool
+            assert (window == cells[1:4, y1:y2]).all()
+
+
+@pytest.mark.parametrize("height", [3, 8, 86])
+def test_logic_matches_bool_arrays(height):
+    a, b = random_cells(7, height, seed=2), random_cells(7, height, seed=3)
+    ga, gb = BitGrid.pack(a), BitGrid.pack(b)
+
+    assert ((ga | gb).unpack() == (a | b)).all()
+    assert ((ga & gb).unpack() == (a & b)).all()
+
+    inverted = ~ga
+    assert (inverted.unpack() == ~a).all()
+    # the padding past the last row stays clear, so it can't leak into any().
+    assert (inverted.words == reference_words(~a)).all()
+    assert not (~BitGrid.pack(np.ones((2, height), dtype=bool))).any()
+
+    ga |= gb
+    assert (ga.unpack() == (a | b)).all()
+    ga &= BitGrid.pack(b)
+    assert (ga.unpack() == b).all()
+
+
+def test_copies_are_independent():
+    grid = BitGrid(4, 10)
+    copy = grid.copy()
+    copy |= BitGrid.pack(np.ones((4, 10), dtype=bool))
+
+    assert copy.any() and not grid.any()
@@ -0,0 +1,71 @@
+from __future__ import annotations
+
+import random
+
+import numpy as np  # type: ignore
+
+from game_map import ChangeLog
+import tile_types
+
+
+def test_changed_since_covers_every_later_mark():
+    rng = random.Random(0)
+    log = ChangeLog(50, 40, history=8)
+    marks = []
+
+    for _ in range(300):
+        x1, y1 = rng.randrange(50), rng.randrange(40)
+        rect = (x1, y1, rng.randrange(x1, 50) + 1, rng.randrange(y1, 40) + 1)
+        log.mark(*rect)
+        marks.append(rect)
+
+        since = rng.randrange(len(marks) + 1)
+        later = marks[since:]
+        if not later:
+            expected = None
+        elif len(later) > 8:
+            expected = (0, 0, 50, 40)  # forgotten, so everything.
+        else:
+            xs1, ys1, xs2, ys2 = zip(*later)
+            expected = (min(xs1), min(ys1), max(xs2), max(ys2))
+
+        assert log.changed_since(since) == expected
+
+
+def expected_graphics(game_map) -> np.ndarray:
+    """What refresh_graphics should come out with outside vision mode, worked
+    out from scratch."""
+    palette = tile_types.palette[game_map.tiles]
+    return np.select(
+        [game_map.visible.unpack(), game_map.explored.unpack()],
+        [palette["light"], palette["dark"]],
+        tile_types.SHROUD,
+    )
+
+
+def test_caches_keep_up_with_scattered_changes(open_map):
+    game_map = open_map(60, 40)
+    rng = np.random.default_rng(1)
+    window = (10, 5, 50, 30)
+
+    for step in range(60):
+        x1, y1 = rng.integers(60), rng.integers(40)
+        x2, y2 = rng.integers(x1, 60) + 1, rng.integers(y1, 40) + 1
+        tile = tile_types.wall if step % 2 else tile_types.floor
+        game_map.set_tiles((slice(x1, x2), slice(y1, y2)), tile)
+
+        if step % 3 == 0:
+            game_map.set_visible(rng.random((60, 40)) < 0.2)
+
+        ids = game_map.tiles
+        assert (game_map.walkable == tile_types.walkable[ids]).all()
+        assert (game_map.transparent == tile_types.transparent[ids]).all()
+
+        # only ever draw part of it, so changes off screen have to wait.
+        if step % 4 == 0:
+            window = (0, 0, 60, 40)
+        elif step % 4 == 1:
+            window = (10, 5, 50, 30)
+        x1, y1, x2, y2 = window
+        got = game_map.refresh_graphics(window)
+        assert (got == expected_graphics(game_map)[x1:x2, y1:y2]).all()
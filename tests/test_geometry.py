@@ -0,0 +1,98 @@
+from __future__ import annotations
+
+import math
+
+import numpy as np  # type: ignore
+import pytest
+
+from geometry import cone, direction, directions, Facing, FACINGS, LUT_RADIUS, offsets
+
+
+# the way it was worked out before the lookup tables, one atan2 at a time.
+OLD_POS = {
+    Facing.NW: (-1, -1), Facing.N: (0, -1), Facing.NE: (1, -1), Facing.E: (1, 0),
+    Facing.SE: (1, 1), Facing.S: (0, 1), Facing.SW: (-1, 1), Facing.W: (-1, 0),
+}
+
+
+def old_get_angle(f: Facing) -> float:
+    pos = OLD_POS[f]
+    return math.atan2(pos[0], pos[1])
+
+
+def old_get_direction(x1: int, y1: int, x2: int = 0, y2: int = 0) -> Facing:
+    angle = math.atan2(y2 - y1, x2 - x1)
+
+    if angle <= math.pi / 8 and angle > -math.pi / 8:
+        return Facing.E
+    elif angle <= 3 * math.pi / 8 and angle > math.pi / 8:
+        return Facing.SE
+    elif angle <= 5 * math.pi / 8 and angle > 3 * math.pi / 8:
+        return Facing.S
+    elif angle <= 7 * math.pi / 8 and angle > 5 * math.pi / 8:
+        return Facing.SW
+    elif angle >= 7 * math.pi / 8 or angle < -7 * math.pi / 8:
+        return Facing.W
+    elif angle >= -3 * math.pi / 8 and angle < -math.pi / 8:
+        return Facing.NE
+    elif angle >= -5 * math.pi / 8 and angle < -3 * math.pi / 8:
+        return Facing.N
+    elif angle >= -7 * math.pi / 8 and angle < -5 * math.pi / 8:
+        return Facing.NW
+
+
+def old_cone(facing: Facing, front: int, side: int, back: int) -> np.ndarray:
+    """The facing mask from the old Actor.get_visibility, around the middle cell."""
+    facing_angle = old_get_angle(facing)
+    mask = np.zeros((2 * front + 1, 2 * front + 1), dtype=bool)
+    for x in range(2 * front + 1):
+        for y in range(2 * front + 1):
+            distance = int(math.sqrt(math.pow(front - x, 2) + math.pow(front - y, 2)))
+            angle = math.atan2(front - x, front - y) + math.pi
+            angle_distance = min(abs(angle - facing_angle), 2 * math.pi - (angle - facing_angle))
+            if angle_distance < math.pi / 4:
+                r = front
+            elif angle_distance < math.pi / 2:
+                r = side
+            else:
+                r = back
+            mask[x, y] = distance <= r
+    return mask
+
+
+def test_direction_matches_the_old_atan2_version():
+    # past the edge of the table, too.
+    reach = LUT_RADIUS + 8
+    for dx in range(-reach, reach + 1):
+        for dy in range(-reach, reach + 1):
+            expected = old_get_direction(0, 0, dx, dy)
+            assert direction(dx, dy) is expected, (dx, dy)
+            assert Facing.get_direction(5, 7, 5 + dx, 7 + dy) is expected
+
+
+def test_directions_matches_direction_for_arrays():
+    rng = np.random.default_rng(0)
+    dx = rng.integers(-200, 201, size=2000)
+    dy = rng.integers(-200, 201, size=2000)
+    # mostly near, so both the table and the slow path get used at once.
+    dx[:1500] //= 8
+    dy[:1500] //= 8
+
+    got = directions(dx, dy)
+    assert [FACINGS[i] for i in got.tolist()] == [
+        old_get_direction(0, 0, x, y) for x, y in zip(dx.tolist(), dy.tolist())
+    ]
+
+
+def test_offsets_and_angles_are_unchanged():
+    for facing in Facing:
+        assert Facing.get_pos(facing) == OLD_POS[facing]
+        assert Facing.get_angle(facing) == old_get_angle(facing)
+
+    xs, ys = offsets(np.array([f.value - 1 for f in Facing]))
+    assert list(zip(xs.tolist(), ys.tolist())) == [OLD_POS[f] for f in Facing]
+
+
+@pytest.mark.parametrize("facing", list(Facing))
+def test_cone_matches_the_old_facing_mask(facing):
+    assert (cone(facing, 24, 6, 2) == old_cone(facing, 24, 6, 2)).all()
@@ -0,0 +1,37 @@
+from __future__ import annotations
+
+import io
+import pickle
+
+from engine import Engine
+from level_streaming import generate_level
+
+PARAMS = dict(
+    max_rooms=10, room_min_size=15, room_max_size=30,
+    map_width=160, map_height=86, max_monsters_per_room=2,
+)
+
+
+class NoEngines(pickle.Pickler):
+    def persistent_id(self, obj):
+        assert not isinstance(obj, Engine), "an engine went along with the level"
+        return None
+
+
+def test_levels_come_built_and_without_an_engine(engine):
+    data = generate_level(7, PARAMS)
+    NoEngines(io.BytesIO()).dump(data)
+
+    data = pickle.loads(pickle.dumps(data))
+    game_map = data.build(engine)
+
+    assert game_map.engine is engine
+    assert engine.player.gamemap is game_map
+    assert (engine.player.x, engine.player.y) == data.player_start
+    assert game_map.room_graph is not None
+
+    # just the one player, and everyone else already filed where they stand.
+    assert [e for e in game_map.entities if e.name == "Player"] == [engine.player]
+    for actor in game_map.actors:
+        assert game_map.actor_at[actor.x, actor.y] is actor
+        assert actor.ai is None or actor.ai.engine is engine
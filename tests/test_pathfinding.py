@@ -0,0 +1,155 @@
+from __future__ import annotations
+
+import random
+
+import numpy as np  # type: ignore
+import tcod
+
+from components.ai import HIERARCHICAL_DISTANCE, HIERARCHICAL_MIN_AREA
+import entity_factories
+from geometry import Facing
+from pathfinding import octile_cost, Path, repair_path, RoomGraph
+import tile_types
+
+
+def assert_walkable_route(game_map, origin, points) -> None:
+    """Every step is one tile from the last, onto open floor."""
+    steps = np.asarray(points).reshape(-1, 2)
+    assert len(steps) > 0
+
+    moves = np.abs(np.diff(np.vstack([origin, steps]), axis=0))
+    assert (moves.max(axis=1) == 1).all(), "the route jumps"
+    assert game_map.walkable[steps[:, 0], steps[:, 1]].all(), "the route goes through a wall"
+
+
+def test_path_steps_along_without_copying():
+    path = Path([(1, 0), (2, 0), (3, 0)])
+    points = path.points
+
+    assert path.pop() == (1, 0)
+    assert len(path) == 2 and path[0] == (2, 0) and path[-1] == (3, 0)
+    assert path.points is points
+
+
+def test_repair_path_stays_contiguous(open_map):
+    game_map = open_map(40, 20)
+    rng = random.Random(3)
+
+    for _ in range(50):
+        origin = (1, rng.randrange(2, 18))
+        goal = (38, origin[1])
+        path = Path([(x, origin[1]) for x in range(2, 39)])
+
+        # a few blockers on the route right ahead, and some scattered about
+        # off it for the detour to get around.
+        blockers = {(x, origin[1]) for x in range(2, 2 + rng.randrange(1, 5))}
+        blockers |= {
+            (rng.randrange(40), rng.randrange(20)) for _ in range(30)
+        } - {(x, origin[1]) for x in range(40)}
+        for x, y in blockers:
+            entity_factories.troll.spawn(game_map, x, y)
+
+        assert repair_path(path, game_map, origin)
+        assert_walkable_route(game_map, origin, path.remaining)
+        assert not set(map(tuple, path.remaining.tolist())) & blockers
+        assert path[-1] == goal
+
+        for entity in list(game_map.actors):
+            if entity is not game_map.engine.player:
+                game_map.remove_entity(entity)
+
+
+def test_repair_path_gives_up_when_walled_in(open_map):
+    game_map = open_map(20, 20)
+    # a corridor one tile wide, with a troll standing in it.
+    game_map.set_tiles((slice(None), 4), tile_types.wall)
+    game_map.set_tiles((slice(None), 6), tile_types.wall)
+    entity_factories.troll.spawn(game_map, 5, 5)
+
+    path = Path([(5, 5), (6, 5), (7, 5)])
+    assert not repair_path(path, game_map, (4, 5))
+    assert path[0] == (5, 5)
+
+
+def test_follow_path_keeps_the_step_if_the_move_fails(open_map):
+    game_map = open_map(20, 10)
+    orc = entity_factories.orc.spawn(game_map, 2, 5)
+    orc.face(Facing.E)
+    orc.ai.waypoint = (10, 5)
+    orc.ai.path = orc.ai.get_path_to(10, 5)
+
+    orc.ai.follow_path()
+    assert (orc.x, orc.y) == (3, 5)
+    assert orc.ai.path[0] == (4, 5)
+
+    # a wall goes up right where it's headed.
+    game_map.set_tiles((4, 5), tile_types.wall)
+    orc.ai.follow_path()
+    assert (orc.x, orc.y) == (3, 5)
+    assert orc.ai.path[0] == (4, 5)
+
+
+def full_search(walkable: np.ndarray, start, goal) -> np.ndarray:
+    """The plain whole-map search RoomGraph stands in for, start left off."""
+    graph = tcod.path.SimpleGraph(cost=walkable.astype(np.int8), cardinal=2, diagonal=3)
+    pathfinder = tcod.path.Pathfinder(graph)
+    pathfinder.add_root(start)
+    return pathfinder.path_to(goal)[1:]
+
+
+def route_cost(origin, points) -> int:
+    return sum(octile_cost(a, b) for a, b in zip([origin] + points, points))
+
+
+def test_room_graph_plans_across_a_big_map(dungeon, monkeypatch):
+    game_map = dungeon(320, 200, seed=2)
+    assert game_map.width * game_map.height > HIERARCHICAL_MIN_AREA
+    walkable = game_map.walkable
+    rng = np.random.default_rng(5)
+
+    # make sure the enemies' own searches go through the graph too.
+    planned = []
+    find_path = RoomGraph.find_path
+    monkeypatch.setattr(
+        RoomGraph, "find_path", lambda *args: planned.append(args) or find_path(*args)
+    )
+
+    xs, ys = np.nonzero(walkable)
+    trips = 0
+    while trips < 30:
+        start, goal = rng.integers(len(xs), size=2)
+        start, goal = (int(xs[start]), int(ys[start])), (int(xs[goal]), int(ys[goal]))
+        if max(abs(start[0] - goal[0]), abs(start[1] - goal[1])) <= HIERARCHICAL_DISTANCE:
+            continue
+        trips += 1
+
+        best = full_search(walkable, start, goal)
+        path = game_map.room_graph.find_path(walkable, start, goal)
+        if not len(best):
+            assert path is None
+            continue
+
+        assert_walkable_route(game_map, start, path)
+        assert tuple(path[-1]) == goal
+        # not the shortest, but not far off.
+        assert route_cost(start, path.tolist()) <= 1.5 * route_cost(start, best.tolist())
+
+    enemy = next(actor for actor in game_map.actors if actor is not game_map.engine.player)
+    goal = max(zip(xs.tolist(), ys.tolist()), key=lambda p: abs(p[0] - enemy.x))
+    path = enemy.ai.get_path_to(*goal)
+    assert planned
+    assert_walkable_route(game_map, (enemy.x, enemy.y), path.remaining)
+
+
+def test_room_graph_legs_go_around_whoever_is_in_the_way(open_map):
+    game_map = open_map(60, 20)
+    graph = RoomGraph([], game_map.walkable)
+    start, goal = (2, 10), (57, 10)
+
+    straight = graph.find_path(game_map.walkable, start, goal)
+    assert (30, 10) in map(tuple, straight.tolist())
+
+    around = graph.find_path(game_map.walkable, start, goal, blocked=[(30, 10)])
+    assert_walkable_route(game_map, start, around)
+    assert (30, 10) not in map(tuple, around.tolist())
+    assert tuple(around[-1]) == goal
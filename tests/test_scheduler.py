@@ -0,0 +1,131 @@
+from __future__ import annotations
+
+import random
+
+from actions import BumpAction
+from components.ai import HostileEnemy
+import entity_factories
+from geometry import OFFSETS
+import tile_types
+
+
+def wander(engine, rng: random.Random) -> None:
+    engine.play_turn(BumpAction(engine.player, *rng.choice(list(OFFSETS.values()))))
+
+
+def spy_on_enemies(monkeypatch, scheduler) -> list:
+    """Record (actor, distance to the player, "perform" or "advance") for
+    every enemy turn taken."""
+    calls = []
+    perform, advance = HostileEnemy.perform, HostileEnemy.advance
+
+    def spy_perform(self):
+        calls.append((self.entity, scheduler.distance_to_player(self.entity), "perform"))
+        return perform(self)
+
+    def spy_advance(self, turns):
+        calls.append((self.entity, scheduler.distance_to_player(self.entity), "advance"))
+        return advance(self, turns)
+
+    monkeypatch.setattr(HostileEnemy, "perform", spy_perform)
+    monkeypatch.setattr(HostileEnemy, "advance", spy_advance)
+    return calls
+
+
+def test_nearby_and_visible_enemies_act_every_turn(dungeon, monkeypatch):
+    game_map = dungeon(320, 200, seed=2, monsters=3)
+    engine = game_map.engine
+    engine.player.fighter.max_hp = engine.player.fighter.hp = 10_000
+    scheduler = engine.scheduler
+    calls = spy_on_enemies(monkeypatch, scheduler)
+
+    rng = random.Random(4)
+    slept = 0
+    for _ in range(80):
+        # the reference: everyone in range or in view once the player has
+        # moved, i.e. everyone that has to act on the next turn.
+        player = engine.player
+        due = {
+            actor for actor in game_map.live_actors
+            if actor is not player and (
+                scheduler.distance_to_player(actor) <= scheduler.near_radius
+                or game_map.visible[actor.x, actor.y]
+            )
+        }
+
+        calls.clear()
+        wander(engine, rng)
+        acted = {actor for actor, _, _ in calls}
+        # unless the player's move killed it.
+        assert {actor for actor in due if actor.is_alive} <= acted
+        slept += len(game_map.live_actors) - 1 - len(acted)
+
+    # otherwise none of this tested anything.
+    assert slept > 0
+
+
+def test_only_near_enemies_get_full_turns(dungeon, monkeypatch):
+    game_map = dungeon(320, 200, seed=3, monsters=3)
+    engine = game_map.engine
+    engine.player.fighter.max_hp = engine.player.fighter.hp = 10_000
+    scheduler = engine.scheduler
+    calls = spy_on_enemies(monkeypatch, scheduler)
+
+    rng = random.Random(5)
+    for _ in range(40):
+        wander(engine, rng)
+
+    assert {kind for _, _, kind in calls} == {"perform", "advance"}
+    for _, distance, kind in calls:
+        assert (kind == "perform") == (distance <= scheduler.near_radius)
+
+
+def test_every_live_enemy_is_queued_once(dungeon):
+    game_map = dungeon(320, 200, seed=4, monsters=3)
+    engine = game_map.engine
+    engine.player.fighter.max_hp = engine.player.fighter.hp = 10_000
+    scheduler = engine.scheduler
+
+    rng = random.Random(6)
+    enemies = sorted(
+        (a for a in game_map.live_actors if a is not engine.player), key=lambda a: (a.x, a.y)
+    )
+    for turn in range(30):
+        if turn == 10:
+            for actor in enemies[:5]:
+                actor.fighter.hp = 0
+        wander(engine, rng)
+
+        queued = [actor for _, _, actor, _ in scheduler.queue]
+        assert len(queued) == len(set(queued))
+        # dead ones are only dropped when their turn comes up.
+        assert {a for a in queued if a.is_alive} == game_map.live_actors - {engine.player}
+        assert all(wake > scheduler.turn for wake, _, _, _ in scheduler.queue)
+
+
+def test_sleepers_wake_before_the_player_can_reach_them(engine, open_map):
+    # a long corridor, walled off from the player so nothing is in view.
+    game_map = open_map(200, 3)
+    game_map.set_tiles((slice(1, 2), slice(None)), tile_types.wall)
+    engine.update_fov()
+    scheduler = engine.scheduler
+    scheduler.sync()
+    player = engine.player
+
+    for x in range(2, 200):
+        enemy = entity_factories.orc.spawn(game_map, x, 1)
+        assert not game_map.visible[x, 1]
+
+        distance = scheduler.distance_to_player(enemy)
+        sleep = scheduler.sleep_for(enemy)
+        assert 1 <= sleep <= scheduler.max_sleep
+        if distance > scheduler.near_radius + 3:
+            assert sleep > 1
+
+        # both sides close in a tile a turn at most. on every turn it sleeps
+        # through, it has to still be out of range.
+        for turn in range(1, sleep):
+            assert distance - 2 * turn > scheduler.near_radius
+
+        game_map.remove_entity(enemy)
+    assert (player.x, player.y) == (0, 0)
@@ -0,0 +1,93 @@
+from __future__ import annotations
+
+import copy
+
+import pytest
+
+import actions
+from components.ai import HostileEnemy
+from components.fighter import Fighter
+from entity import Actor, Entity
+import entity_factories
+from message_log import Message
+from pathfinding import Path
+
+
+def all_subclasses(cls):
+    for sub in cls.__subclasses__():
+        yield sub
+        yield from all_subclasses(sub)
+
+
+@pytest.mark.parametrize(
+    "cls",
+    [Entity, Actor, Fighter, HostileEnemy, Message, actions.Action, *all_subclasses(actions.Action)],
+    ids=lambda cls: cls.__name__,
+)
+def test_no_instance_dict(cls):
+    assert not hasattr(object.__new__(cls), "__dict__")
+
+
+def slot_values(entity) -> dict:
+    values = {}
+    for name in type(entity)._slot_names():
+        try:
+            values[name] = getattr(entity, name)
+        except AttributeError:
+            pass
+    return values
+
+
+def test_deepcopy_matches_the_generic_copy(monkeypatch):
+    orc = entity_factories.orc
+    ours = copy.deepcopy(orc)
+
+    # copy's own way of doing it, for slotted objects.
+    monkeypatch.delattr(Entity, "__deepcopy__")
+    reference = copy.deepcopy(orc)
+
+    ours_values, reference_values = slot_values(ours), slot_values(reference)
+    assert ours_values.keys() == reference_values.keys() == slot_values(orc).keys()
+    assert "gamemap" not in ours_values
+
+    for name in ("ai", "fighter"):
+        ours_component, reference_component = ours_values.pop(name), reference_values.pop(name)
+        assert type(ours_component) is type(reference_component)
+        assert ours_component is not getattr(orc, name)
+        # and it points back at the copy, not the template.
+        assert ours_component.entity is ours
+        for slot in type(ours_component).__slots__:
+            if slot == "entity" or not hasattr(reference_component, slot):
+                continue
+            a, b = getattr(ours_component, slot), getattr(reference_component, slot)
+            if isinstance(a, Path):
+                assert a is not getattr(getattr(orc, name), slot)
+                a, b = a.remaining.tolist(), b.remaining.tolist()
+            assert a == b
+
+    assert ours_values == reference_values
+
+
+def test_spawned_actors_keep_their_slots(open_map):
+    game_map = open_map(20, 20)
+    orc = entity_factories.orc.spawn(game_map, 5, 6)
+
+    assert (orc.x, orc.y, orc.gamemap) == (5, 6, game_map)
+    assert orc in game_map.live_actors and game_map.actor_at[5, 6] is orc
+    assert orc.fighter.hp == entity_factories.orc.fighter.hp
+    assert orc.ai.entity is orc and orc.fighter.entity is orc
+    assert orc.ai.engine is game_map.engine
+
+    # the template is untouched.
+    assert not hasattr(entity_factories.orc, "gamemap")
+    assert entity_factories.orc.fighter.entity is entity_factories.orc
+
+
+def test_action_engine_is_looked_up_once(open_map):
+    game_map = open_map(20, 20)
+    action = actions.WaitAction(game_map.engine.player)
+    assert action.engine is game_map.engine
+
+    # cached, so it's still there even once the entity isn't on a map.
+    del action.entity.gamemap
+    assert action.engine is game_map.engine
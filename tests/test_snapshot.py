@@ -0,0 +1,129 @@
+from __future__ import annotations
+
+import random
+
+import numpy as np  # type: ignore
+
+from actions import BumpAction, WaitAction
+from entity import Actor
+from game_map import GameMap
+from geometry import OFFSETS
+
+
+def entity_state(entity) -> tuple:
+    state = (
+        entity.x, entity.y, entity.facing, entity.char, entity.color, entity.name,
+        entity.blocks_movement, entity.render_order,
+    )
+    if not isinstance(entity, Actor):
+        return state
+
+    ai = entity.ai
+    path = getattr(ai, "path", None)
+    return state + (
+        entity.fighter.hp, ai, entity.target_lock,
+        getattr(ai, "mode", None), getattr(ai, "waypoint", None),
+        None if path is None else tuple(map(tuple, path.remaining.tolist())),
+    )
+
+
+def game_state(engine) -> dict:
+    """Everything a rewind has to put back, copied out so play can't change it."""
+    game_map = engine.game_map
+    scheduler = engine.scheduler
+    return {
+        "random": random.getstate(),
+        "scheduler": (scheduler.turn, sorted(scheduler.queue, key=lambda i: i[:2]), scheduler._counter),
+        "entities": {entity: entity_state(entity) for entity in game_map.entities},
+        "registries": (
+            set(game_map.live_actors), set(game_map.corpses), set(game_map.others),
+            dict(game_map.actor_at), dict(game_map.blocking_at),
+        ),
+        "layers": [
+            np.array(layer, copy=True) for layer in (
+                game_map.tiles, game_map.visible.words, game_map.explored.words,
+                game_map.decal_ch, game_map.decal_fg,
+            )
+        ],
+        "decal_names": dict(game_map.decal_names),
+        "messages": [(m.plain_text, m.count) for m in engine.message_log.messages],
+    }
+
+
+def assert_same_state(a: dict, b: dict) -> None:
+    for key in a:
+        if key == "layers":
+            assert all((x == y).all() for x, y in zip(a[key], b[key])), key
+        else:
+            assert a[key] == b[key], key
+
+
+def play(engine, rng: random.Random, turns: int) -> None:
+    for _ in range(turns):
+        player = engine.player
+        if rng.random() < 0.2:
+            engine.play_turn(WaitAction(player))
+        else:
+            engine.play_turn(BumpAction(player, *rng.choice(list(OFFSETS.values()))))
+
+
+def registries_from_scratch(game_map) -> tuple:
+    fresh = GameMap(game_map.engine, game_map.width, game_map.height, entities=game_map.entities)
+    return (
+        fresh.live_actors, fresh.corpses, fresh.others, fresh.actor_at, fresh.blocking_at,
+    )
+
+
+def test_restore_puts_everything_back(dungeon):
+    game_map = dungeon(160, 86, seed=3, monsters=3)
+    engine = game_map.engine
+    engine.player.fighter.max_hp = engine.player.fighter.hp = 10_000
+    inputs = random.Random(9)
+
+    play(engine, inputs, 20)
+    snapshot = engine.snapshot()
+    before = game_state(engine)
+
+    # kill a few, so the registries and decals change too.
+    for actor in sorted(game_map.actors, key=lambda a: (a.x, a.y))[1:4]:
+        if actor is not engine.player:
+            actor.fighter.hp = 0
+    play(engine, random.Random(10), 30)
+    assert game_state(engine)["registries"] != before["registries"]
+
+    engine.restore(snapshot)
+    assert_same_state(before, game_state(engine))
+    assert registries_from_scratch(game_map) == before["registries"]
+
+
+def test_replaying_after_a_rewind_gets_the_same_game(dungeon):
+    game_map = dungeon(160, 86, seed=5, monsters=3)
+    engine = game_map.engine
+    engine.player.fighter.max_hp = engine.player.fighter.hp = 10_000
+
+    play(engine, random.Random(1), 10)
+    snapshot = engine.snapshot()
+
+    play(engine, random.Random(2), 40)
+    first = game_state(engine)
+
+    engine.restore(snapshot)
+    play(engine, random.Random(2), 40)
+    assert_same_state(first, game_state(engine))
+
+
+def test_rewind_steps_back_one_player_turn_at_a_time(dungeon):
+    game_map = dungeon(160, 86, seed=7, monsters=3)
+    engine = game_map.engine
+    engine.player.fighter.max_hp = engine.player.fighter.hp = 10_000
+    inputs = random.Random(3)
+
+    states = []
+    for _ in range(5):
+        states.append(game_state(engine))
+        play(engine, inputs, 1)
+
+    for state in reversed(states):
+        assert engine.rewind()
+        assert_same_state(state, game_state(engine))
+    assert not engine.rewind()
@@ -0,0 +1,53 @@
+from __future__ import annotations
+
+import pytest
+
+import soak
+
+
+@pytest.mark.parametrize("render, chunked", [(False, False), (True, False), (False, True)])
+def test_games_play_through_without_crashing(render, chunked):
+    result = soak.play((160, 86, 2), seed=1, turns=60, render=render, chunked=chunked)
+
+    assert result["error"] is None
+    assert result["enemies"] > 0
+    assert result["turns"] == len(result["latencies"]) == 60
+    assert all(t > 0 for t in result["latencies"])
+
+
+def test_a_crash_is_reported_not_raised(monkeypatch):
+    import engine
+
+    def boom(self, action):
+        raise RuntimeError("boom")
+
+    monkeypatch.setattr(engine.Engine, "play_turn", boom)
+    result = soak.play((160, 86, 1), seed=1, turns=10, render=False, chunked=False)
+
+    assert "RuntimeError: boom" in result["error"]
+    assert result["turns"] == 0
+
+
+def test_summary_matches_a_plain_recount():
+    results = [
+        dict(latencies=[0.001, 0.002, 0.003], error=None, enemies=4, peak_rss_mb=50.0),
+        dict(latencies=[0.010], error="Traceback...", enemies=6, peak_rss_mb=70.0),
+        dict(latencies=[], error=None, enemies=5, peak_rss_mb=60.0),
+    ]
+    summary = soak.summarize(results)
+
+    latencies = sorted([0.001, 0.002, 0.003, 0.010])
+    assert summary["games"] == 3
+    assert summary["crashes"] == 1
+    assert summary["enemies"] == pytest.approx(5.0)
+    assert summary["turns"] == 4
+    assert summary["turns_per_sec"] == pytest.approx(4 / sum(latencies))
+    # numpy interpolates between the middle two.
+    assert summary["p50_ms"] == pytest.approx((latencies[1] + latencies[2]) / 2 * 1000)
+    assert latencies[-2] * 1000 < summary["p99_ms"] <= latencies[-1] * 1000
+    assert summary["peak_rss_mb"] == 70.0
+
+
+def test_parse_size():
+    assert soak.parse_size("600x400") == (600, 400)
+    assert soak.parse_size("160X86") == (160, 86)
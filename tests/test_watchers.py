@@ -0,0 +1,113 @@
+from __future__ import annotations
+
+import numpy as np  # type: ignore
+import pytest
+import tcod
+
+from entity import VISION_RADIUS
+from geometry import cone, Facing
+import tile_types
+
+
+def reference_vision(actor, transparent: np.ndarray, algorithm: int) -> np.ndarray:
+    """An enemy's vision over the whole map, without cropping to its box."""
+    r = VISION_RADIUS
+    width, height = transparent.shape
+    seen = tcod.map.compute_fov(transparent, (actor.x, actor.y), radius=r, algorithm=algorithm)
+
+    # the cone, put down on a padded map so it doesn't need clipping.
+    facing = np.zeros((width + 2 * r, height + 2 * r), dtype=bool)
+    facing[actor.x:actor.x + 2 * r + 1, actor.y:actor.y + 2 * r + 1] = cone(actor.facing, r, 6, 2)
+    return seen & facing[r:r + width, r:r + height]
+
+
+def reference_counts(game_map, algorithm: int) -> np.ndarray:
+    counts = np.zeros((game_map.width, game_map.height), dtype=np.int16)
+    for actor in game_map.actors:
+        if actor is not game_map.engine.player:
+            counts += reference_vision(actor, game_map.transparent, algorithm)
+    return counts
+
+
+def shake_up(game_map, rng: np.random.Generator) -> None:
+    """Move and turn some enemies, kill one now and then, and change some walls."""
+    player = game_map.engine.player
+    enemies = sorted(
+        (actor for actor in game_map.actors if actor is not player), key=lambda a: (a.x, a.y)
+    )
+
+    for actor in enemies:
+        roll = rng.random()
+        if roll < 0.3:
+            dx, dy = (int(d) for d in rng.integers(-1, 2, size=2))
+            x, y = actor.x + dx, actor.y + dy
+            if game_map.in_bounds(x, y) and game_map.is_walkable(x, y) and (x, y) not in game_map.blocking_at:
+                actor.move(dx, dy)
+        elif roll < 0.5:
+            actor.face(list(Facing)[int(rng.integers(8))])
+        elif roll < 0.52:
+            actor.fighter.hp = 0
+
+    for _ in range(3):
+        x, y = int(rng.integers(game_map.width)), int(rng.integers(game_map.height))
+        if (x, y) not in game_map.blocking_at:
+            game_map.set_tiles((x, y), tile_types.wall if rng.random() < 0.5 else tile_types.floor)
+
+
+@pytest.mark.parametrize("site", ["enemy", "overlay"])
+def test_counts_match_a_full_recompute(dungeon, site):
+    game_map = dungeon(160, 86, seed=4, monsters=3)
+    engine = game_map.engine
+    watchers = game_map.watchers if site == "enemy" else game_map.overlay_watchers
+    if site == "overlay":
+        engine.fov.overlay = tcod.FOV_DIAMOND
+    rng = np.random.default_rng(2)
+
+    for step in range(40):
+        shake_up(game_map, rng)
+        algorithm = getattr(engine.fov, site)
+
+        if step % 5 == 0:
+            # look at a bit of the map only, like the overlay does.
+            x1, y1 = int(rng.integers(100)), int(rng.integers(40))
+            got = watchers.window(x1, y1, x1 + 60, y1 + 40)
+            assert (got == reference_counts(game_map, algorithm)[x1:x1 + 60, y1:y1 + 40]).all()
+        else:
+            got = watchers.window(0, 0, game_map.width, game_map.height)
+            assert (got == reference_counts(game_map, algorithm)).all()
+
+        if step == 20:
+            # and the counts follow the algorithm, too.
+            setattr(engine.fov, site, tcod.FOV_PERMISSIVE_4)
+
+
+def test_sees_matches_each_enemys_own_vision(dungeon):
+    game_map = dungeon(160, 86, seed=6, monsters=3)
+    rng = np.random.default_rng(3)
+
+    for _ in range(10):
+        shake_up(game_map, rng)
+        for actor in game_map.actors:
+            if actor is game_map.engine.player:
+                continue
+            expected = reference_vision(actor, game_map.transparent, game_map.engine.fov.enemy)
+            xs = rng.integers(max(0, actor.x - 30), min(game_map.width, actor.x + 30), size=20)
+            ys = rng.integers(max(0, actor.y - 30), min(game_map.height, actor.y + 30), size=20)
+            for x, y in zip(xs.tolist(), ys.tolist()):
+                assert game_map.watchers.sees(actor, x, y) == expected[x, y]
+
+
+def test_counts_start_over_after_a_restore(dungeon):
+    game_map = dungeon(160, 86, seed=8, monsters=3)
+    engine = game_map.engine
+    rng = np.random.default_rng(4)
+
+    game_map.watchers.window(0, 0, game_map.width, game_map.height)
+    snapshot = engine.snapshot()
+    for _ in range(5):
+        shake_up(game_map, rng)
+        game_map.watchers.window(0, 0, game_map.width, game_map.height)
+
+    engine.restore(snapshot)
+    got = game_map.watchers.window(0, 0, game_map.width, game_map.height)
+    assert (got == reference_counts(game_map, engine.fov.enemy)).all()
@@ -1,4 +1,4 @@
-from typing import Tuple
+from typing import List, Tuple
 
 import numpy as np  # type: ignore
 
@@ -26,6 +26,11 @@ tile_dt = np.dtype(
 )
 
 
+# Every tile type, in the order they're defined. Maps store a tile's id (its
+# index in here) rather than the whole struct.
+_tiles: List[np.ndarray] = []
+
+
 def new_tile(
     *,  # Enforce the use of keywords, so that parameter order doesn't matter.
     walkable: int,
@@ -36,9 +41,12 @@ def new_tile(
     dark_vision : Tuple[int, Tuple[int, int, int], Tuple[int, int, int]],
     light_vision : Tuple[int, Tuple[int, int, int], Tuple[int, int, int]],
 
-) -> np.ndarray:
-    """Helper function for defining individual tile types """
-    return np.array((walkable, transparent, dark, light, dark_vision, light_vision), dtype=tile_dt)
+) -> int:
+    """Helper function for defining individual tile types. Returns the tile's id."""
+    _tiles.append(
+        np.array((walkable, transparent, dark, light, dark_vision, light_vision), dtype=tile_dt)
+    )
+    return len(_tiles) - 1
 
 
 # SHROUD represents unexplored, unseen tiles
@@ -62,3 +70,17 @@ wall = new_tile(
     dark_vision=(ord(" "), (255, 255, 255), (80, 80, 80)),
     light_vision=(ord(" "), (255, 255, 255), (160, 160, 160)),
 )
+
+
+# The tile struct for every tile id, and the bits of it that get looked up a lot.
+palette = np.array(_tiles, dtype=tile_dt)
+walkable = palette["walkable"]
+transparent = palette["transparent"]
+
+# What to draw for a tile, indexed by [vision_mode, visible, explored, tile id].
+render_lut = np.empty((2, 2, 2, len(palette)), dtype=graphic_dt)
+render_lut[:, 0, 0] = SHROUD
+render_lut[0, 0, 1] = palette["dark"]
+render_lut[0, 1, :] = palette["light"]
+render_lut[1, 0, 1] = palette["dark_vision"]
+render_lut[1, 1, :] = palette["light_vision"]
@@ -0,0 +1,205 @@
+"""Structured tracing for the turn loop.
+
+Call sites check the category mask before building anything:
+
+    if tracing.mask & tracing.AI:
+        tracing.emit(tracing.AI, "arrived", actor=actor.name, x=actor.x, y=actor.y)
+
+While tracing is off `mask` is 0, so that costs an attribute read and an AND.
+When it's on, events go to a sink that either buffers them and writes in
+batches, or hands them to a background thread, so the turn loop never waits
+on a write.
+
+Set SNEAK_TRACE to a comma separated list of categories (or "all") to turn it
+on from the environment. See configure_from_env.
+"""
+from __future__ import annotations
+
+import atexit
+import os
+import queue
+import sys
+import threading
+import time
+from enum import auto, IntEnum, IntFlag
+from typing import Any, Dict, IO, List, Mapping, Tuple
+
+
+class Category(IntFlag):
+    AI = auto()  # enemy AI decisions and mode changes.
+    ACTION = auto()  # every action that gets performed with a direction.
+    LOCK = auto()  # target locks gained and lost.
+
+
+# plain ints, not Category members: an AND between two IntFlags builds a
+# new flag, and costs about 50 times what it does between ints. that adds up
+# on the guards, which run whether tracing is on or not.
+AI = int(Category.AI)
+ACTION = int(Category.ACTION)
+LOCK = int(Category.LOCK)
+ALL = AI | ACTION | LOCK
+
+
+class Level(IntEnum):
+    DEBUG = 10
+    INFO = 20
+    WARNING = 30
+
+
+DEBUG = Level.DEBUG
+INFO = Level.INFO
+WARNING = Level.WARNING
+
+# (time, category, level, event name, fields)
+Event = Tuple[float, int, Level, str, Dict[str, Any]]
+
+
+def format_event(event: Event) -> str:
+    timestamp, category, level, name, fields = event
+    details = " ".join(f"{key}={value}" for key, value in fields.items())
+    return f"{timestamp:.6f} {level.name} {Category(category).name.lower()} {name} {details}\n"
+
+
+class BufferedSink:
+    """Hold events in memory and write them out a batch at a time."""
+
+    def __init__(self, stream: IO[str], capacity: int = 4096):
+        self.stream = stream
+        self.capacity = capacity
+        self.events: List[Event] = []
+
+    def write(self, event: Event) -> None:
+        self.events.append(event)
+        if len(self.events) >= self.capacity:
+            self.flush()
+
+    def flush(self) -> None:
+        self.stream.writelines(format_event(event) for event in self.events)
+        self.stream.flush()
+        self.events.clear()
+
+    def close(self) -> None:
+        self.flush()
+
+
+class BackgroundSink:
+    """Hand events to a thread that formats and writes them."""
+
+    def __init__(self, stream: IO[str]):
+        self.stream = stream
+        self.queue: queue.SimpleQueue = queue.SimpleQueue()
+        self.thread = threading.Thread(target=self._run, name="tracing", daemon=True)
+        self.thread.start()
+
+    def write(self, event: Event) -> None:
+        self.queue.put(event)
+
+    def _run(self) -> None:
+        while True:
+            event = self.queue.get()
+
+            # grab everything else that's waiting too, so we write in batches.
+            lines = []
+            while event is not None:
+                lines.append(format_event(event))
+                try:
+                    event = self.queue.get_nowait()
+                except queue.Empty:
+                    break
+
+            self.stream.writelines(lines)
+            self.stream.flush()
+
+            if event is None:
+                return
+
+    def close(self) -> None:
+        self.queue.put(None)
+        self.thread.join()
+
+
+# the categories being traced right now. 0 means tracing is off.
+mask = 0
+
+_level = Level.DEBUG
+_sink = None
+# the file configure_from_env opened for the sink, if it did. closed along
+# with the sink. stderr never is.
+_file = None
+
+
+def enable(categories: int = ALL, level: Level = DEBUG, sink=None) -> None:
+    """Start tracing `categories` at `level` and above, into `sink`.
+
+    Without a sink, events go to stderr from a background thread.
+    """
+    global mask, _level, _sink
+
+    disable()
+
+    _sink = sink if sink is not None else BackgroundSink(sys.stderr)
+    _level = level
+    mask = int(categories)
+
+
+def disable() -> None:
+    """Stop tracing, writing out anything still held by the sink."""
+    global mask, _sink, _file
+
+    mask = 0
+    if _sink is not None:
+        _sink.close()
+        _sink = None
+    if _file is not None:
+        _file.close()
+        _file = None
+
+
+def emit(category: int, name: str, level: Level = DEBUG, **fields: Any) -> None:
+    """Record an event. Guard calls with `if tracing.mask & category:`."""
+    if _sink is None or level < _level or not mask & category:
+        return
+
+    _sink.write((time.perf_counter(), category, level, name, fields))
+
+
+def configure_from_env(environ: Mapping[str, str] = os.environ) -> None:
+    """Turn tracing on from environment variables, if they ask for it.
+
+    SNEAK_TRACE        categories to trace, e.g. "ai,lock", or "all".
+    SNEAK_TRACE_LEVEL  debug (the default), info or warning.
+    SNEAK_TRACE_FILE   where to write. stderr if unset.
+    SNEAK_TRACE_SINK   "background" (the default) or "buffered".
+    """
+    global _file
+
+    names = environ.get("SNEAK_TRACE", "").strip().lower()
+    if not names:
+        return
+
+    categories = 0
+    for name in names.split(","):
+        name = name.strip()
+        if name == "all":
+            categories |= ALL
+        elif name:
+            categories |= Category[name.upper()]
+
+    level = Level[environ.get("SNEAK_TRACE_LEVEL", "debug").upper()]
+
+    path = environ.get("SNEAK_TRACE_FILE")
+    stream = open(path, "a", encoding="utf-8") if path else sys.stderr
+
+    if environ.get("SNEAK_TRACE_SINK", "background") == "buffered":
+        sink = BufferedSink(stream)
+    else:
+        sink = BackgroundSink(stream)
+
+    enable(categories, level, sink)
+
+    if path:
+        _file = stream
+
+
+# make sure nothing gets lost in a buffer on the way out.
+atexit.register(disable)
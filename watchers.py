@@ -0,0 +1,129 @@
+from __future__ import annotations
+
+from typing import Dict, Iterable, Optional, Set, Tuple, TYPE_CHECKING
+
+import numpy as np  # type: ignore
+
+from entity import VISION_RADIUS
+
+if TYPE_CHECKING:
+    from entity import Actor
+    from game_map import GameMap, Rect
+
+
+def _overlaps(a: Rect, b: Rect) -> bool:
+    return a[0] < b[2] and b[0] < a[2] and a[1] < b[3] and b[1] < a[3]
+
+
+class Watchers:
+    """How many enemies can see each tile of a map, with one of the
+    FovSettings sites' algorithms ("enemy" or "overlay").
+
+    Every enemy's vision (see Actor.vision) is added into `counts`. When one
+    moves or turns, or the walls near it change, its old vision is taken
+    back out and the new one put in.
+
+    That happens lazily. A change only marks the enemy stale, and anything
+    reading the counts says which part of the map it wants first. So an
+    enemy that takes several steps between looks gets its FOV computed once,
+    and ones nowhere near what's being looked at don't get computed at all.
+    """
+
+    def __init__(self, game_map: GameMap, site: str = "enemy"):
+        self.game_map = game_map
+        self.site = site
+        self.counts = np.zeros((game_map.width, game_map.height), dtype=np.int16, order="F")
+
+        # what each enemy adds to counts right now: the box and the cells in it.
+        self.vision: Dict[Actor, Tuple[Rect, np.ndarray]] = {}
+        # enemies whose vision in counts is out of date, or missing.
+        self.stale: Set[Actor] = set()
+
+        # what the visions in counts were computed from.
+        self._tile_version = game_map.tile_changes.version
+        self._algorithm: Optional[int] = None
+
+    def add(self, actor: Actor) -> None:
+        self.stale.add(actor)
+
+    def remove(self, actor: Actor) -> None:
+        self.stale.discard(actor)
+        self._take_out(actor)
+
+    def changed(self, actor: Actor) -> None:
+        """The actor moved or turned. Does nothing if it isn't watching."""
+        if actor in self.vision:
+            self.stale.add(actor)
+
+    def reset(self, actors: Iterable[Actor]) -> None:
+        """Start over with these actors, e.g. after restoring a snapshot."""
+        self.counts[:] = 0
+        self.vision.clear()
+        self.stale = set(actors)
+
+    def window(self, x1: int, y1: int, x2: int, y2: int) -> np.ndarray:
+        """The counts for [x1:x2, y1:y2], up to date. Don't write to it."""
+        self.refresh((x1, y1, x2, y2))
+        return self.counts[x1:x2, y1:y2]
+
+    def sees(self, actor: Actor, x: int, y: int) -> bool:
+        """Can this one enemy see x, y? Only brings its own vision up to date."""
+        self._check_map()
+        if actor in self.stale:
+            self._update(actor)
+
+        (x1, y1, x2, y2), cells = self.vision[actor]
+        return x1 <= x < x2 and y1 <= y < y2 and bool(cells[x - x1, y - y1])
+
+    def cells(self, actor: Actor) -> Optional[Tuple[Rect, np.ndarray]]:
+        """An enemy's vision as it is in counts, if it's in there. Refresh
+        first if it matters."""
+        return self.vision.get(actor)
+
+    def refresh(self, rect: Rect) -> None:
+        """Bring the counts inside rect up to date."""
+        self._check_map()
+        if not self.stale:
+            return
+
+        r = VISION_RADIUS
+        for actor in [
+            actor for actor in self.stale
+            # it can see into rect from where it is now, or could from where
+            # it was when its vision went in.
+            if _overlaps((actor.x - r, actor.y - r, actor.x + r + 1, actor.y + r + 1), rect)
+            or (actor in self.vision and _overlaps(self.vision[actor][0], rect))
+        ]:
+            self._update(actor)
+
+    def _check_map(self) -> None:
+        """Mark stale whoever's vision the walls or the FOV algorithm changed under."""
+        game_map = self.game_map
+
+        algorithm = getattr(game_map.engine.fov, self.site)
+        if algorithm != self._algorithm:
+            self._algorithm = algorithm
+            self.stale.update(self.vision)
+
+        tile_changes = game_map.tile_changes
+        dirty = tile_changes.changed_since(self._tile_version)
+        if dirty is not None:
+            self._tile_version = tile_changes.version
+            self.stale.update(
+                actor for actor, (box, _) in self.vision.items() if _overlaps(box, dirty)
+            )
+
+    def _update(self, actor: Actor) -> None:
+        self._take_out(actor)
+        self.stale.discard(actor)
+
+        box, cells = actor.vision(self.game_map.transparent, self._algorithm)
+        x1, y1, x2, y2 = box
+        self.counts[x1:x2, y1:y2] += cells
+        self.vision[actor] = box, cells
+
+    def _take_out(self, actor: Actor) -> None:
+        old = self.vision.pop(actor, None)
+        if old is not None:
+            (x1, y1, x2, y2), cells = old
+            self.counts[x1:x2, y1:y2] -= cells